@@ -0,0 +1,187 @@
+"""
+Expose the bus and context states to other processes.
+
+The bridge listens on a Unix domain socket. Each message in either
+direction is a 4 byte big endian length followed by a JSON object:
+
+    {"op": "dispatch", "kind": ..., "origin": ..., "payload": ...}
+    {"op": "set_state", "name": ..., "value": ...}
+    {"op": "states"}  -> {"states": {...}, "version": ...}
+    {"op": "states", "since": version}
+        -> {"states": {changed...}, "removed": [...], "version": ...}
+
+Only "states" is answered, so dispatch and set_state can be streamed at
+whatever rate the client can produce them. Passing "since" the version of
+an earlier reply only returns what changed after it. Processes run by
+Task.execute_process find the socket through $MATRIX_BUS_SOCKET and the
+version of the states they were given as "states_version" on stdin.
+
+"""
+import asyncio
+import json
+import logging
+import os
+import shutil
+import socket
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+from .journal import encode_payload
+
+log = logging.getLogger("bridge")
+
+ENV_VAR = "MATRIX_BUS_SOCKET"
+_frame = struct.Struct(">I")
+
+
+def encode_frame(data):
+    data = json.dumps(data, default=encode_payload).encode("utf-8")
+    return _frame.pack(len(data)) + data
+
+
+async def read_frame(reader, object_hook=None):
+    try:
+        header = await reader.readexactly(_frame.size)
+        size, = _frame.unpack(header)
+        data = await reader.readexactly(size)
+    except asyncio.IncompleteReadError:
+        return None
+    return json.loads(data.decode("utf-8"), object_hook=object_hook)
+
+
+class BusBridge:
+    def __init__(self, bus, context, path=None):
+        self.bus = bus
+        self.context = context
+        self._tmpdir = None
+        if path is None:
+            # keep clear of the ~108 byte limit on socket paths
+            self._tmpdir = tempfile.mkdtemp(prefix="matrix-")
+            path = Path(self._tmpdir, "bus.sock")
+        self.path = Path(path)
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_unix_server(
+            self.handle, path=str(self.path))
+        log.debug("Bus bridge listening on %s", self.path)
+        return self
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+        elif self.path.exists():
+            self.path.unlink()
+
+    def environ(self):
+        return {ENV_VAR: str(self.path)}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                msg = await read_frame(reader)
+                if msg is None:
+                    break
+                try:
+                    reply = self.apply(msg)
+                except Exception:
+                    log.warning("Bad bridge message %s", msg, exc_info=True)
+                    continue
+                if reply is not None:
+                    writer.write(encode_frame(reply))
+                    await writer.drain()
+        finally:
+            writer.close()
+
+    def apply(self, msg):
+        op = msg.get("op")
+        if op == "dispatch":
+            self.bus.dispatch(
+                kind=msg["kind"],
+                origin=msg.get("origin", "bridge"),
+                payload=msg.get("payload"),
+                created="bridge")
+        elif op == "set_state":
+            self.context.set_state(msg["name"], msg["value"])
+        elif op == "states":
+            states = self.context.states
+            since = msg.get("since")
+            if since is None:
+                return {"states": dict(states), "version": states.version}
+            changed, removed = states.diff(since)
+            return {"states": changed, "removed": removed,
+                    "version": states.version}
+        else:
+            raise ValueError("Unknown bridge op: {}".format(op))
+
+
+class Client:
+    """
+    Blocking client for use in task processes.
+
+        from matrix.bridge import Client
+        with Client() as bus:
+            bus.set_state("load.status", "running")
+            bus.dispatch("load.sample", {"rps": 1200})
+
+    Writes are buffered and flushed by states(), changes(), flush() and
+    close(). Pass the ``version`` a task was given on stdin to only see the
+    changes made after it from changes().
+
+    """
+    def __init__(self, path=None, origin=None, version=None):
+        path = path or os.environ[ENV_VAR]
+        self.origin = origin or os.path.basename(sys.argv[0])
+        self.version = version
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str(path))
+        self.wfile = self.sock.makefile("wb")
+        self.rfile = self.sock.makefile("rb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _send(self, msg):
+        self.wfile.write(encode_frame(msg))
+
+    def dispatch(self, kind, payload=None, origin=None):
+        self._send({"op": "dispatch", "kind": kind,
+                    "origin": origin or self.origin, "payload": payload})
+
+    def set_state(self, name, value):
+        self._send({"op": "set_state", "name": name, "value": value})
+
+    def _request(self, msg):
+        self._send(msg)
+        self.flush()
+        size, = _frame.unpack(self.rfile.read(_frame.size))
+        return json.loads(self.rfile.read(size).decode("utf-8"))
+
+    def states(self):
+        reply = self._request({"op": "states"})
+        self.version = reply["version"]
+        return reply["states"]
+
+    def changes(self):
+        """Return (changed states, removed names) since the last call."""
+        reply = self._request({"op": "states", "since": self.version})
+        self.version = reply["version"]
+        return reply["states"], reply.get("removed", [])
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        self.flush()
+        self.wfile.close()
+        self.rfile.close()
+        self.sock.close()
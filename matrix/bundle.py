@@ -0,0 +1,55 @@
+"""The bundle under test, compared with what a model runs."""
+from pathlib import Path
+
+from .utils import load_yaml
+
+
+def bundle_shape(path):
+    """
+    Return {application: units} as declared by the bundle.yaml at
+    ``path``, units being None for subordinates, or None if there is no
+    bundle.yaml.
+
+    """
+    bundle = Path(path, "bundle.yaml")
+    if not bundle.exists():
+        return None
+    data = load_yaml(bundle) or {}
+    apps = data.get("applications") or data.get("services") or {}
+    return {name: (spec or {}).get("num_units")
+            for name, spec in apps.items()}
+
+
+async def restore_shape(model, path, log):
+    """
+    Scale ``model`` back to the shape of the bundle at ``path``: add or
+    destroy units and remove applications the bundle does not declare.
+    Returns False if that can't be done, i.e. there is no bundle.yaml or
+    applications of the bundle are gone.
+
+    """
+    shape = bundle_shape(path)
+    if shape is None:
+        log.info("No bundle.yaml in %s to restore the model from", path)
+        return False
+    missing = set(shape) - set(model.applications)
+    if missing:
+        log.info("Applications %s are gone from the model",
+                 ", ".join(sorted(missing)))
+        return False
+    for name, app in list(model.applications.items()):
+        if name not in shape:
+            log.info("Removing %s", name)
+            await app.remove()
+            continue
+        units = shape[name]
+        if units is None:
+            continue
+        current = list(app.units)
+        if len(current) < units:
+            log.info("Adding %d unit(s) to %s", units - len(current), name)
+            await app.add_unit(count=units - len(current))
+        for unit in current[units:]:
+            log.info("Destroying %s", unit.name)
+            await unit.destroy()
+    return True
@@ -1,90 +1,690 @@
 import asyncio
+import collections
+import fnmatch
+import itertools
 import logging
+import math
 import sys
+import time
 import uuid
-from pathlib import Path
+import weakref
 
 import attr
 
 from .model import Event
+from .utils import current_task
 
 log = logging.getLogger("bus")
 _marker = object()
+# Keyword arguments to dispatch that are set on the event itself, the rest
+# go into the payload
+EVENT_FIELDS = frozenset(
+    [f.name for f in attr.fields(Event) if not f.name.startswith("_")] +
+    ["created"])
+
+# Index modes used by the condition helpers below
+EXACT = "exact"
+PREFIX = "prefix"
+_WILDCARDS = "*?["
+
+# Priority lanes, lower values are delivered first
+CONTROL = 0
+NORMAL = 1
+BULK = 2
+
+# (pattern, lane) pairs, the first matching pattern wins. Control plane
+# events overtake queued telemetry, order is kept within each lane. The
+# test.* events share a lane so a test can't complete before it starts;
+# test.finish stays behind the queued events of the run.
+DEFAULT_PRIORITIES = [
+    ("shutdown", CONTROL),
+    ("state.change", CONTROL),
+    ("rule.*", CONTROL),
+    ("test.finish", NORMAL),
+    ("test.*", CONTROL),
+    ("logging.*", BULK),
+    ("*", NORMAL),
+]
+
+# Overflow policies for a bounded EventQueue
+KEEP = "keep"          # always queued, even past maxsize
+DROP = "drop"          # dropped while the queue is full
+COALESCE = "coalesce"  # merged into a queued event if possible, else dropped
+
+# (pattern, policy) pairs, the first matching pattern wins. Control events
+# (shutdown, state.change, rule.*, test.*, ...) fall through to KEEP.
+DEFAULT_POLICIES = [
+    ("logging.*", COALESCE),
+    ("*", KEEP),
+]
 
 
 # Condition helpers
+#
+# Each helper is a plain predicate on the event, but it also records the
+# kind (or kind prefix) it selects so that Bus.subscribe can route the
+# subscription through an index rather than testing it on every event.
 def eq(expected):
     def _eq(e):
         return e.kind == expected
+    _eq.index = (EXACT, expected)
     return _eq
 
 
 def prefixed(expected):
     def _prefixed(e):
         return e.kind.startswith(expected)
+    _prefixed.index = (PREFIX, expected)
     return _prefixed
 
 
+def glob(pattern):
+    """Match event kinds against an fnmatch style pattern."""
+    def _glob(e):
+        return fnmatch.fnmatch(e.kind, pattern)
+
+    pos = min([pattern.find(c) for c in _WILDCARDS if c in pattern] or
+              [len(pattern)])
+    if pos == len(pattern):
+        _glob.index = (EXACT, pattern)
+    else:
+        _glob.index = (PREFIX, pattern[:pos])
+        # Anything but a trailing "*" still has to be tested on delivery,
+        # the literal prefix only narrows the candidates.
+        _glob.residual = pattern[pos:] != "*"
+    return _glob
+
+
+class PrefixTrie:
+    """Map string prefixes to values, matching every prefix of a key."""
+    def __init__(self):
+        self.root = {}
+
+    def add(self, prefix, value):
+        node = self.root
+        for c in prefix:
+            node = node.setdefault(c, {})
+        node.setdefault(None, []).append(value)
+
+    def remove(self, prefix, value):
+        path = [self.root]
+        for c in prefix:
+            node = path[-1].get(c)
+            if node is None:
+                return
+            path.append(node)
+        values = path[-1].get(None, [])
+        if value in values:
+            values.remove(value)
+        if not values:
+            path[-1].pop(None, None)
+        # prune branches left empty
+        for i in range(len(prefix), 0, -1):
+            if path[i]:
+                break
+            del path[i - 1][prefix[i - 1]]
+
+    def match(self, key):
+        node = self.root
+        result = list(node.get(None, []))
+        for c in key:
+            node = node.get(c)
+            if node is None:
+                break
+            result.extend(node.get(None, []))
+        return result
+
+
+def subscriber_name(subscriber):
+    try:
+        return subscriber.__func__.__qualname__
+    except AttributeError:
+        try:
+            return subscriber.__name__
+        except AttributeError:
+            return str(subscriber)
+
+
+class Subscription:
+    __slots__ = ("uid", "seq", "subscriber", "name", "conditions", "index",
+                 "queue", "worker", "max_in_flight", "in_flight", "active",
+                 "batch", "max_batch", "max_wait", "batch_start")
+
+    def __init__(self, uid, seq, subscriber, conditions, index=None):
+        self.uid = uid
+        self.seq = seq
+        self.subscriber = subscriber
+        self.name = subscriber_name(subscriber)
+        # conditions left to test once the index has routed an event here
+        self.conditions = conditions
+        # (mode, key) this subscription is indexed under, None for fallback
+        self.index = index
+        # isolated subscriptions are fed through their own queue and worker
+        self.queue = None
+        self.worker = None
+        self.max_in_flight = 1
+        self.in_flight = set()
+        self.active = True
+        # batch subscriptions are called with a list of events
+        self.batch = None
+        self.max_batch = 0
+        self.max_wait = None
+        self.batch_start = None
+
+    @property
+    def isolated(self):
+        return self.queue is not None
+
+    def accepts(self, event):
+        for condition in self.conditions:
+            if not condition(event):
+                return False
+        return True
+
+
+class Histogram:
+    """
+    Latency histogram with power of two buckets, starting at 1µs.
+
+    Cheap enough to update on every delivery; quantiles are estimated as
+    the upper bound of the bucket they fall in.
+
+    """
+    base = 1e-6
+
+    def __init__(self):
+        self.buckets = collections.Counter()
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if value <= self.base:
+            bucket = 0
+        else:
+            bucket = math.frexp(value / self.base)[1]
+        self.buckets[bucket] += 1
+
+    def upper(self, bucket):
+        return self.base * (2 ** bucket)
+
+    def quantile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.upper(bucket), self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": {"<={:g}".format(self.upper(b)): n
+                        for b, n in sorted(self.buckets.items())},
+        }
+
+
+class BusStats:
+    """Counters and latency histograms kept by the bus."""
+    def __init__(self):
+        self.dispatched = collections.Counter()
+        self.delivered = collections.Counter()
+        # subscriber name -> Histogram of time spent in the handler
+        self.handlers = collections.defaultdict(Histogram)
+        # time from dispatch until notify picked the event off the queue
+        self.queue_latency = Histogram()
+
+    def as_dict(self):
+        return {
+            "dispatched": dict(self.dispatched),
+            "delivered": dict(self.delivered),
+            "queue_latency": self.queue_latency.as_dict(),
+            "handlers": {name: h.as_dict()
+                         for name, h in self.handlers.items()},
+        }
+
+
+def merge_log_records(queued, event):
+    """Fold the log record of ``event`` into the queued logging event."""
+    record, new = queued.payload, event.payload
+    record.output = "{}\n{}".format(record.output, new.output)
+    if new.levelno > record.levelno:
+        record.levelno = new.levelno
+        record.levelname = new.levelname
+    record.coalesced = getattr(record, "coalesced", 1) + 1
+
+
+MERGERS = {
+    "logging.message": merge_log_records,
+}
+
+
+def _first_match(kind, table, default):
+    for pattern, value in table:
+        if fnmatch.fnmatch(kind, pattern):
+            return value
+    return default
+
+
+class EventQueue:
+    """
+    Prioritised queue of events for the bus.
+
+    Each event is put in a lane according to ``priorities``. get() always
+    takes from the most urgent non empty lane, so control events are not
+    held up behind bulk telemetry, while order within a lane is kept.
+
+    With a ``maxsize`` the queue applies a per kind overflow policy once it
+    is full: KEEP events are queued regardless, DROP events are discarded
+    and COALESCE events are merged into a recently queued event of the
+    same kind and origin (see MERGERS) or discarded when there is none.
+    ``dropped`` and ``coalesced`` count what was lost or merged by kind.
+
+    """
+    coalesce_window = 16
+
+    def __init__(self, loop, maxsize=0, policies=None, priorities=None):
+        self.loop = loop
+        self.maxsize = maxsize
+        self.policies = list(policies or DEFAULT_POLICIES)
+        self.priorities = list(priorities or DEFAULT_PRIORITIES)
+        self.dropped = collections.Counter()
+        self.coalesced = collections.Counter()
+        self._lanes = [collections.deque() for _ in range(
+            max(p for _, p in self.priorities) + 1)]
+        self._size = 0
+        self.peak = 0
+        self._kinds = {}
+        self._waiter = None
+
+    def qsize(self):
+        return self._size
+
+    def empty(self):
+        return self._size == 0
+
+    def full(self):
+        return 0 < self.maxsize <= self._size
+
+    def classify(self, kind):
+        """Return the (lane, policy) pair for events of ``kind``."""
+        info = self._kinds.get(kind)
+        if info is None:
+            info = self._kinds[kind] = (
+                _first_match(kind, self.priorities, NORMAL),
+                _first_match(kind, self.policies, KEEP))
+        return info
+
+    def policy(self, kind):
+        return self.classify(kind)[1]
+
+    def _coalesce(self, lane, event):
+        merge = MERGERS.get(event.kind)
+        if merge is None:
+            return False
+        for i, queued in enumerate(reversed(lane)):
+            if i >= self.coalesce_window:
+                break
+            if queued.kind == event.kind and queued.origin == event.origin:
+                merge(queued, event)
+                return True
+        return False
+
+    def put_nowait(self, event):
+        """Queue ``event``, returning False if it was merged or dropped."""
+        priority, policy = self.classify(event.kind)
+        lane = self._lanes[priority]
+        if self.full():
+            if policy == COALESCE and self._coalesce(lane, event):
+                self.coalesced[event.kind] += 1
+                return False
+            if policy != KEEP:
+                self.dropped[event.kind] += 1
+                return False
+        lane.append(event)
+        self._size += 1
+        if self._size > self.peak:
+            self.peak = self._size
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+        return True
+
+    async def get(self):
+        while not self._size:
+            self._waiter = self.loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        for lane in self._lanes:
+            if lane:
+                self._size -= 1
+                return lane.popleft()
+
+
 class Bus:
-    def __init__(self, loop=None):
+    def __init__(self, loop=None, maxsize=0, priorities=None):
         self.loop = loop or asyncio.get_event_loop()
         self.__subscriptions = {}
-        self.__queue = asyncio.Queue()
+        self.__exact = {}
+        self.__prefixes = PrefixTrie()
+        self.__fallback = []
+        self.__routes = {}
+        # batch subscriptions holding undelivered events
+        self.__batching = set()
+        self.__seq = itertools.count()
+        self.__queue = EventQueue(self.loop, maxsize,
+                                  priorities=priorities)
         self._exit_on_exception = False
         self.should_run = True
         self.skip_debug_list = ["logging.message"]
+        # record where each event was dispatched from
+        self.callsite = True
+        self._stats = BusStats()
+        # asyncio task -> test name, see tag_task
+        self._task_tags = weakref.WeakKeyDictionary()
+        # seconds to let isolated subscribers drain when the bus stops
+        self.drain_timeout = 5.0
+
+    def subscribe(self, subscriber, *conditions, isolated=False,
+                  maxsize=100, max_in_flight=1,
+                  batch=False, max_batch=100, max_wait=None):
+        """
+        Subscribe ``subscriber`` to the events matching all ``conditions``.
+
+        By default subscribers are called inline by notify, one event at a
+        time. An ``isolated`` subscriber gets its own queue of at most
+        ``maxsize`` events and a worker task which runs up to
+        ``max_in_flight`` calls concurrently, so a slow subscriber only
+        delays itself. notify only waits on it when its queue is full.
 
-    def subscribe(self, subscriber, *conditions):
+        A ``batch`` subscriber is called with a list of the matching events
+        instead, once notify has drained the queue, once ``max_batch``
+        events are collected or once the oldest collected event is
+        ``max_wait`` seconds old, whichever comes first.
+
+        """
         if not callable(subscriber):
             raise TypeError("subscriber must be callable")
         for c in conditions:
             if not callable(c):
                 raise TypeError("conditions must be callable {}".format(c))
+        # The first condition that knows the kinds it selects is used to
+        # index the subscription, everything else is tested on delivery.
+        index = None
+        residual = []
+        for c in conditions:
+            if index is None and getattr(c, "index", None):
+                index = c.index
+                if getattr(c, "residual", False):
+                    residual.append(c)
+            else:
+                residual.append(c)
+
         uid = uuid.uuid4()
-        self.__subscriptions[uid] = (subscriber, conditions)
+        sub = Subscription(uid, next(self.__seq), subscriber,
+                           tuple(residual), index)
+        if index is None:
+            self.__fallback.append(sub)
+        elif index[0] == EXACT:
+            self.__exact.setdefault(index[1], []).append(sub)
+        else:
+            self.__prefixes.add(index[1], sub)
+        if batch:
+            sub.batch = []
+            sub.max_batch = max_batch
+            sub.max_wait = max_wait
+        if isolated:
+            sub.queue = asyncio.Queue(maxsize=maxsize)
+            sub.max_in_flight = max_in_flight
+            sub.worker = self.loop.create_task(self._worker(sub))
+        self.__subscriptions[uid] = sub
+        self.__routes.clear()
         return uid
 
     def unsubscribe(self, uid):
-        self.__subscriptions.pop(uid, None)
+        sub = self.__subscriptions.pop(uid, None)
+        if sub is None:
+            return
+        if sub.index is None:
+            self.__fallback.remove(sub)
+        elif sub.index[0] == EXACT:
+            subs = self.__exact[sub.index[1]]
+            subs.remove(sub)
+            if not subs:
+                del self.__exact[sub.index[1]]
+        else:
+            self.__prefixes.remove(sub.index[1], sub)
+        self.__routes.clear()
+        sub.active = False
+        if sub in self.__batching:
+            self.__batching.discard(sub)
+            if not sub.isolated and \
+                    not asyncio.iscoroutinefunction(sub.subscriber):
+                # hand over what was collected so far
+                sub.subscriber(sub.batch)
+        if sub.isolated:
+            # Drop anything still queued, calls already in flight are left
+            # to finish.
+            while not sub.queue.empty():
+                sub.queue.get_nowait()
+                sub.queue.task_done()
+            sub.queue.put_nowait(_marker)
+
+    @property
+    def maxsize(self):
+        return self.__queue.maxsize
+
+    @maxsize.setter
+    def maxsize(self, value):
+        self.__queue.maxsize = value
+
+    def overflow(self):
+        """Return the counts of dropped and coalesced events by kind."""
+        return {"dropped": dict(self.__queue.dropped),
+                "coalesced": dict(self.__queue.coalesced)}
+
+    def stats(self):
+        """
+        Return a snapshot of the bus statistics: events dispatched and
+        delivered by kind, queue depth (current and peak), overflow counts,
+        dispatch to delivery latency and handler latency by subscriber.
+
+        """
+        stats = self._stats.as_dict()
+        stats["queue"] = {"depth": self.__queue.qsize(),
+                          "peak": self.__queue.peak}
+        stats["overflow"] = self.overflow()
+        stats["subscribers"] = {
+            str(uid): {"name": name, "queued": queued, "in_flight": n}
+            for uid, (name, queued, n) in self.queue_depths().items()}
+        return stats
+
+    def slowest(self, n=5):
+        """Return the ``n`` subscribers that spent the most time handling."""
+        handlers = self._stats.handlers.items()
+        return sorted(handlers, key=lambda i: i[1].total, reverse=True)[:n]
+
+    def queue_depths(self):
+        """
+        Return a mapping of subscription uid to a (name, queued, in_flight)
+        tuple for each isolated subscriber.
+
+        """
+        return {sub.uid: (sub.name, sub.queue.qsize(), len(sub.in_flight))
+                for sub in self.__subscriptions.values() if sub.isolated}
+
+    def tag_task(self, task, test):
+        """
+        Tag events dispatched from ``task`` (without an explicit test) with
+        the name of ``test``.
+
+        """
+        self._task_tags[task] = test
+
+    def route(self, kind):
+        """
+        Return the subscriptions that may want events of ``kind``, in
+        subscription order. Routes are cached until the subscriptions
+        change.
+
+        """
+        subs = self.__routes.get(kind)
+        if subs is None:
+            subs = self.__exact.get(kind, []) + \
+                self.__prefixes.match(kind) + \
+                self.__fallback
+            subs.sort(key=lambda s: s.seq)
+            self.__routes[kind] = subs
+        return subs
 
     def dispatch(self, event=None, **kwargs):
-        args = {}
-        if isinstance(event, dict):
-            args = event
         if not isinstance(event, Event):
+            args = event if isinstance(event, dict) else {}
             # create an event object from the args
             if kwargs:
-                fields = attr.fields(Event)
-                names = [f.name for f in fields]
                 payload = args.setdefault("payload", kwargs.pop("payload", {}))
                 for k, v in list(kwargs.items()):
-                    if k not in names:
-                        if isinstance(payload, dict):
-                            payload[k] = kwargs.pop(k)
-                    else:
+                    if k in EVENT_FIELDS:
                         args[k] = v
+                    elif isinstance(payload, dict):
+                        payload[k] = kwargs.pop(k)
             event = Event()
             for k, v in args.items():
                 setattr(event, k, v)
 
         # Add runtime information
-        event.time = self.loop.time()
-        if "created" not in kwargs:
+        if "time" not in kwargs:
+            event.time = self.loop.time()
+        if event.test is None and self._task_tags:
+            task = current_task(self.loop)
+            if task is not None:
+                event.test = self._task_tags.get(task)
+        if self.callsite and "created" not in kwargs:
+            # Keep the raw frame details, Event.created formats them when
+            # (and if) someone reads it.
             call_frame = sys._getframe(1)
-            c = call_frame.f_code
-            p = Path(c.co_filename)
-            created = "{}:{}:{}::{}".format(
-                    __package__,
-                    p,
-                    call_frame.f_lineno,
-                    c.co_name)
-            event.created = created
+            event.created = (call_frame.f_code, call_frame.f_lineno)
         # Fire
+        self._stats.dispatched[event.kind] += 1
         self.__queue.put_nowait(event)
 
+    async def _call(self, sub, event, evt_ct=0):
+        subscriber = sub.subscriber
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(subscriber):
+                await subscriber(event)
+            else:
+                subscriber(event)
+        except Exception:
+            log.warn("Exception %s for %s %d",
+                     sub.name,
+                     event,
+                     evt_ct,
+                     exc_info=True,
+                     stack_info=True)
+            return False
+        finally:
+            self._stats.handlers[sub.name].record(
+                time.perf_counter() - start)
+            if isinstance(event, list):
+                for e in event:
+                    self._stats.delivered[e.kind] += 1
+            else:
+                self._stats.delivered[event.kind] += 1
+        return True
+
+    async def _deliver(self, sub, event, evt_ct=0):
+        if sub.isolated:
+            # Only blocks when this subscriber is maxsize behind
+            await sub.queue.put(event)
+            return True
+        return await self._call(sub, event, evt_ct)
+
+    async def _flush_batches(self, drained):
+        """
+        Deliver pending batches, all of them when the queue is ``drained``
+        otherwise only those that have waited longer than max_wait.
+
+        """
+        ok = True
+        now = self.loop.time()
+        for sub in sorted(self.__batching, key=lambda s: s.seq):
+            if not drained and (sub.max_wait is None or
+                                now - sub.batch_start < sub.max_wait):
+                continue
+            self.__batching.discard(sub)
+            events, sub.batch = sub.batch, []
+            if not await self._deliver(sub, events):
+                ok = False
+        return ok
+
+    async def _worker(self, sub):
+        slots = asyncio.Semaphore(sub.max_in_flight)
+
+        def done(task):
+            sub.in_flight.discard(task)
+            slots.release()
+            sub.queue.task_done()
+            if task.cancelled():
+                return
+            if task.result() is False and self._exit_on_exception is True:
+                self.shutdown()
+
+        while sub.active:
+            # take a slot first so queued events stay visible in qsize
+            await slots.acquire()
+            event = await sub.queue.get()
+            if event is _marker or not sub.active:
+                sub.queue.task_done()
+                break
+            task = self.loop.create_task(self._call(sub, event))
+            sub.in_flight.add(task)
+            task.add_done_callback(done)
+
+    async def _drain(self, stop=False):
+        isolated = [s for s in self.__subscriptions.values() if s.isolated]
+        if not isolated:
+            return
+        joins = [s.queue.join() for s in isolated]
+        try:
+            await asyncio.wait_for(asyncio.gather(*joins), self.drain_timeout)
+        except asyncio.TimeoutError:
+            log.warn("Isolated subscribers failed to drain in %ss",
+                     self.drain_timeout)
+        if stop:
+            for sub in isolated:
+                sub.worker.cancel()
+                for task in list(sub.in_flight):
+                    task.cancel()
+
     async def notify(self, until_complete=False):
         # until_complete is used for simplified testing
+        try:
+            await self._notify(until_complete)
+        finally:
+            await self._drain(stop=self.should_run is False)
+            overflow = self.overflow()
+            if any(overflow.values()):
+                log.info("Bus overflow: %s", overflow)
+
+    async def _notify(self, until_complete):
         evt_ct = 0
+        stopping = False
         while True:
             # This check is mostly for testing on
             # an empty loop
@@ -93,62 +693,58 @@ class Bus:
                     break
             event = await self.__queue.get()
             evt_ct += 1
+            self._stats.queue_latency.record(self.loop.time() - event.time)
             # Now push the event to subscribers
             applied = False
-            subscriptions = list(self.__subscriptions.values())
 
-            for subscriber, conditions in subscriptions:
+            for sub in self.route(event.kind):
                 # Should this go back into the event loop? or can we count on
                 # the subscriber to do the proper thing. If the idea is to keep
                 # a journal with transaction like support, which is a lie as
                 # the driver changes are not idempotent, then we must have some
                 # support for the idea that the event has really been processed
                 # at the end of this
-                use = True
-
-                for condition in conditions:
-                    if not condition(event):
-                        use = False
-                        break
-                if use is True:
-                    try:
-                        name = subscriber.__func__.__qualname__
-                    except AttributeError:
-                        try:
-                            name = subscriber.__name__
-                        except AttributeError:
-                            name = str(subscriber)
-
-                    if event.kind not in self.skip_debug_list:
-                        log.debug("#%d %s -> %s", evt_ct, event, name)
-                    applied = True
-
-                    try:
-                        if asyncio.iscoroutinefunction(subscriber):
-                            await subscriber(event)
-                        else:
-                            subscriber(event)
-                    except Exception as e:
-                        log.warn("Exception %s for %s %d",
-                                 name,
-                                 event,
-                                 evt_ct,
-                                 exc_info=True,
-                                 stack_info=True)
-                        if self._exit_on_exception is True:
-                            self.shutdown()
-                            return
+                if not sub.active or not sub.accepts(event):
+                    continue
+                if event.kind not in self.skip_debug_list:
+                    log.debug("#%d %s -> %s", evt_ct, event, sub.name)
+                applied = True
+
+                delivery = event
+                if sub.batch is not None:
+                    if not sub.batch:
+                        sub.batch_start = self.loop.time()
+                        self.__batching.add(sub)
+                    sub.batch.append(event)
+                    if len(sub.batch) < sub.max_batch:
+                        continue
+                    self.__batching.discard(sub)
+                    delivery, sub.batch = sub.batch, []
+                ok = await self._deliver(sub, delivery, evt_ct)
+                if not ok and self._exit_on_exception is True:
+                    self.shutdown()
+                    return
 
             if not applied:
                 log.debug("Unhandled event %s %d", event, evt_ct)
 
+            if self.__batching:
+                ok = await self._flush_batches(self.__queue.qsize() == 0)
+                if not ok and self._exit_on_exception is True:
+                    self.shutdown()
+                    return
+
             if event.kind == "shutdown":
-                log.debug("Exiting Bus with shutdown event")
-                break
+                # shutdown overtakes queued telemetry, deliver what is
+                # left before exiting
+                log.debug("Shutdown event, draining %d queued events",
+                          self.__queue.qsize())
+                stopping = True
 
             # Track the event after it has been applied
             if self.__queue.qsize() == 0:
-                if until_complete is True or self.should_run is False:
+                if until_complete is True or self.should_run is False or \
+                        stopping:
                     log.debug("Bus Complete, exiting")
                     break
 
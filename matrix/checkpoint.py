@@ -0,0 +1,70 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+from .model import COMPLETE
+
+log = logging.getLogger("matrix")
+
+
+class Checkpoint:
+    """
+    Progress of a run, rewritten to checkpoint.json in the output dir as
+    tests and rules complete so that ``--resume`` can pick up where a run
+    stopped.
+
+    ``finished`` maps test names to their results. ``running`` maps the
+    tests in progress to the model they run on and the states of the
+    rules they completed.
+
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.finished = {}
+        self.running = {}
+        self.exit_code = None
+
+    @classmethod
+    def load(cls, path):
+        checkpoint = cls(path)
+        if not checkpoint.path.exists():
+            log.warning("No checkpoint at %s, starting from scratch", path)
+            return checkpoint
+        with checkpoint.path.open() as fp:
+            data = json.load(fp)
+        checkpoint.finished = data.get("finished", {})
+        checkpoint.running = data.get("running", {})
+        checkpoint.exit_code = data.get("exit_code")
+        return checkpoint
+
+    def save(self):
+        data = {"finished": self.finished,
+                "running": self.running,
+                "exit_code": self.exit_code}
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            with tmp.open("w") as fp:
+                json.dump(data, fp, indent=2, sort_keys=True)
+            os.replace(str(tmp), str(self.path))
+        except OSError:
+            log.exception("Unable to write %s", self.path)
+
+    def start(self, test, model_name):
+        self.running[test.name] = {"model": model_name, "states": {}}
+        self.save()
+
+    def update(self, test, states):
+        """Record the rules of ``test`` completed so far."""
+        running = self.running.get(test.name)
+        if running is None:
+            return
+        running["states"] = {k: v for k, v in states.items()
+                             if v == COMPLETE}
+        self.save()
+
+    def finish(self, test, result, exit_code):
+        self.running.pop(test.name, None)
+        self.finished[test.name] = result
+        self.exit_code = exit_code
+        self.save()
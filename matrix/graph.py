@@ -0,0 +1,211 @@
+"""
+Static analysis of the rules in a test.
+
+Conditions refer to other rules only through state names, a RuleGraph
+resolves those names to the rules setting them so that mistakes (cycles,
+conditions on states nothing sets) show up when a suite is loaded rather
+than as rules blocked forever. Combined with the rule durations recorded
+by earlier runs it also estimates the schedule of a test and its critical
+path.
+
+"""
+import collections
+import json
+import logging
+from pathlib import Path
+
+from .model import COMPLETE
+
+log = logging.getLogger("matrix")
+
+# Conditions which keep a rule from starting
+BLOCKING = ("after", "when", "while")
+# The dependent rule can start once its dependency is running (START) or
+# only once it is complete (FINISH)
+START = "start"
+FINISH = "finish"
+
+Step = collections.namedtuple(
+    "Step", "name start finish duration critical")
+
+
+class RuleGraph:
+    def __init__(self, test_name, rules):
+        self.test_name = test_name
+        self.rules = collections.OrderedDict((r.name, r) for r in rules)
+        # rule name -> [(dependency name, START|FINISH)]
+        self.deps = collections.OrderedDict((n, []) for n in self.rules)
+        # rule name -> [statements no rule in the test sets]
+        self.unresolved = collections.OrderedDict()
+        for rule in rules:
+            for condition in rule.conditions:
+                if condition.mode not in BLOCKING:
+                    continue
+                dep = self.producer(condition)
+                if dep is None:
+                    self.unresolved.setdefault(rule.name, []).append(
+                        condition.statement)
+                else:
+                    self.deps[rule.name].append(dep)
+        self.order = self._toposort()
+        self.unreachable = self._unreachable()
+
+    def producer(self, condition):
+        """
+        Return the (rule name, edge) setting the state ``condition`` waits
+        on, or None if no rule in the test sets it.
+
+        """
+        state = condition.state
+        if state in self.rules:
+            if "." in condition.statement:
+                values = [condition.statement.rsplit(".", 1)[1]]
+            else:
+                values = condition.TRIGGERS[condition.mode]
+            edge = FINISH if set(values) == {COMPLETE} else START
+            return state, edge
+        # states like health.status are set by the health task while it
+        # runs
+        for name in self.rules:
+            if state.startswith(name + "."):
+                return name, START
+        return None
+
+    def _toposort(self):
+        remaining = collections.OrderedDict(
+            (n, {d for d, _ in deps}) for n, deps in self.deps.items())
+        order = []
+        while remaining:
+            ready = [n for n, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(
+                    "Rules in test '{}' wait on each other: {}".format(
+                        self.test_name, ", ".join(remaining)))
+            for name in ready:
+                del remaining[name]
+                order.append(name)
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+
+    def _unreachable(self):
+        unreachable = collections.OrderedDict(
+            (n, list(s)) for n, s in self.unresolved.items())
+        for name in self.order:
+            blocked = [d for d, _ in self.deps[name] if d in unreachable]
+            if blocked and name not in unreachable:
+                unreachable[name] = blocked
+        return unreachable
+
+    def warn(self):
+        for name, waits_on in self.unreachable.items():
+            log.warning("Rule '%s' in test '%s' waits on %s, which nothing "
+                        "in the test will provide",
+                        name, self.test_name, ", ".join(waits_on))
+
+    def schedule(self, durations=None):
+        """
+        Estimate when each rule starts and finishes given ``durations``
+        (rule name -> seconds), returning Steps in start order. Rules
+        without a recorded duration count as instant, unreachable rules
+        have a start of None.
+
+        """
+        durations = durations or {}
+        start, finish, via = {}, {}, {}
+        for name in self.order:
+            if name in self.unreachable:
+                continue
+            start[name] = 0.0
+            for dep, edge in self.deps[name]:
+                at = start[dep] if edge == START else finish[dep]
+                if name not in via or at > start[name]:
+                    start[name], via[name] = at, dep
+            finish[name] = start[name] + durations.get(name, 0.0)
+
+        critical = set()
+        if finish:
+            name = max(finish, key=lambda n: finish[n])
+            while name is not None:
+                critical.add(name)
+                name = via.get(name)
+
+        steps = [Step(n, start.get(n), finish.get(n), durations.get(n),
+                      n in critical)
+                 for n in self.order]
+        steps.sort(key=lambda s: (s.start is None, s.start or 0.0))
+        return steps
+
+    def critical_path(self, durations=None):
+        """Return (expected duration, [rule names]) of the critical path."""
+        steps = [s for s in self.schedule(durations) if s.critical]
+        if not steps:
+            return 0.0, []
+        return max(s.finish for s in steps), [s.name for s in steps]
+
+    def prioritized(self, durations=None):
+        """
+        The rules of the test, those heading the longest chains of work
+        first. Without durations this is the order of the test.
+
+        """
+        durations = durations or {}
+        dependents = collections.defaultdict(list)
+        for name, deps in self.deps.items():
+            for dep, edge in deps:
+                dependents[dep].append((name, edge))
+        tail = {}
+        for name in reversed(self.order):
+            own = durations.get(name, 0.0)
+            tail[name] = own
+            for other, edge in dependents[name]:
+                after = tail[other] if edge == START else own + tail[other]
+                tail[name] = max(tail[name], after)
+        position = {n: i for i, n in enumerate(self.rules)}
+        names = sorted(self.rules, key=lambda n: (-tail[n], position[n]))
+        return [self.rules[n] for n in names]
+
+
+def format_plan(test, durations=None):
+    """Describe the expected schedule of ``test`` for --explain-plan."""
+    graph = test.graph
+    total, path = graph.critical_path(durations)
+    lines = ["{} ({})".format(test.name, test.description or "")]
+    if total:
+        lines.append("  critical path {:.1f}s: {}".format(
+            total, " -> ".join(path)))
+    lines.append("  {:>8} {:>8}   {}".format("start", "finish", "rule"))
+    for step in graph.schedule(durations):
+        if step.start is None:
+            lines.append("  {:>8} {:>8}   {} (waits on {})".format(
+                "-", "-", step.name,
+                ", ".join(graph.unreachable[step.name])))
+            continue
+        finish = "?" if step.duration is None else \
+            "{:.1f}".format(step.finish)
+        lines.append("  {:>8.1f} {:>8} {} {}".format(
+            step.start, finish, "*" if step.critical and total else " ",
+            step.name))
+    return "\n".join(lines)
+
+
+def load_durations(path):
+    """Read the rule durations recorded by earlier runs, if any."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        with path.open() as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        log.warning("Ignoring unreadable durations file %s", path)
+        return {}
+
+
+def save_durations(path, durations):
+    path = Path(path)
+    try:
+        with path.open("w") as fp:
+            json.dump(durations, fp, indent=2, sort_keys=True)
+    except OSError:
+        log.exception("Unable to write %s", path)
@@ -0,0 +1,196 @@
+import argparse
+import asyncio
+import json
+import logging
+import mmap
+import struct
+from pathlib import Path
+
+import attr
+
+from . import model
+from . import utils
+
+log = logging.getLogger("matrix")
+
+MAGIC = b"MXJ1"
+_frame = struct.Struct(">I")
+
+
+def encode_payload(obj):
+    """
+    JSON ``default`` hook reducing event payloads to plain data.
+
+    The result keeps the attributes the views read (names, log output,
+    results) so that a replayed journal renders like the original run.
+
+    """
+    if isinstance(obj, logging.LogRecord):
+        return {"name": obj.name,
+                "levelname": obj.levelname,
+                "levelno": obj.levelno,
+                "output": getattr(obj, "output", obj.getMessage())}
+    if isinstance(obj, model.Context):
+        return {"suite": obj.suite,
+                "states": dict(obj.states),
+                "teardowns": obj.teardowns}
+    if isinstance(obj, model.Rule):
+        return {"name": obj.name,
+                "task": obj.task,
+                "conditions": [str(c) for c in obj.conditions]}
+    if isinstance(obj, model.Task):
+        return {"name": obj.name,
+                "command": obj.command,
+                "args": obj.args,
+                "gating": obj.gating}
+    if attr.has(type(obj)):
+        # fields kept out of the repr (compiled graphs, models, ...) are
+        # internal
+        return attr.asdict(obj, recurse=False,
+                           filter=lambda a, value: a.repr)
+    info = getattr(obj, "info", None)
+    if info is not None:
+        # libjuju models
+        return {"info": {"name": info.name}}
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def encode_event(event):
+    data = {"time": event.time,
+            "created": event.created,
+            "origin": event.origin,
+            "kind": event.kind,
+            "payload": event.payload}
+    data = json.dumps(data, default=encode_payload, separators=(",", ":"))
+    data = data.encode("utf-8")
+    return _frame.pack(len(data)) + data
+
+
+class Journal:
+    """
+    Append only record of every event on the bus.
+
+    Events are stored as length prefixed JSON frames after a short header,
+    which keeps the file cheap to write and lets ``read_journal`` walk it
+    through mmap without parsing line breaks.
+
+    """
+    def __init__(self, path):
+        self.path = Path(path)
+        self.fp = self.path.open("wb")
+        self.fp.write(MAGIC)
+
+    def subscribe(self, bus):
+        return bus.subscribe(self.write, batch=True)
+
+    def write(self, events):
+        for event in events:
+            try:
+                self.fp.write(encode_event(event))
+            except Exception:
+                log.debug("Unable to journal %s", event.kind, exc_info=True)
+        self.fp.flush()
+
+    def close(self):
+        self.fp.close()
+
+
+def read_journal(path):
+    """Yield the events of a journal as dicts, payloads as utils.O."""
+    with open(str(path), "rb") as fp:
+        if fp.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a matrix journal".format(path))
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset = len(MAGIC)
+            end = len(data)
+            while offset + _frame.size <= end:
+                size, = _frame.unpack_from(data, offset)
+                offset += _frame.size
+                if offset + size > end:
+                    log.warning("Truncated journal entry at %d", offset)
+                    break
+                yield json.loads(data[offset:offset + size].decode("utf-8"),
+                                 object_hook=utils.O)
+                offset += size
+
+
+async def replay(bus, path, speed=0):
+    """
+    Feed the events of the journal at ``path`` back through ``bus``.
+
+    With a ``speed`` of 0 events are replayed as fast as possible, otherwise
+    the original spacing of the events is divided by ``speed``.
+
+    """
+    first = None
+    start = bus.loop.time()
+    for entry in read_journal(path):
+        if entry.kind == "model.new":
+            # replays must not poke at (possibly still live) models
+            continue
+        if first is None:
+            first = entry.time
+        if speed:
+            delay = start + (entry.time - first) / speed - bus.loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        else:
+            # let notify keep up
+            await asyncio.sleep(0)
+        bus.dispatch(time=entry.time,
+                     created=entry.created,
+                     origin=entry.origin,
+                     kind=entry.kind,
+                     payload=entry.payload)
+
+
+def replay_main(args=None):
+    from urwid import AsyncioEventLoop, MainLoop, raw_display
+    from .bus import Bus
+    from .view import TUIView, RawView, XUnitView, palette
+
+    parser = argparse.ArgumentParser(
+        prog="matrix replay",
+        description="Replay a journal recorded by a previous matrix run.")
+    parser.add_argument("journal", type=Path)
+    parser.add_argument("-s", "--skin", choices=("tui", "raw"), default="raw")
+    parser.add_argument("-x", "--xunit", default=None, metavar='FILENAME',
+                        help="Create an XUnit report file")
+    parser.add_argument("-S", "--speed", default=0, type=float,
+                        help="Replay speed relative to the original run, "
+                             "0 (the default) replays as fast as possible")
+    options = parser.parse_args(args)
+
+    loop = asyncio.get_event_loop()
+    bus = Bus(loop=loop)
+    context = model.Context(loop=loop, bus=bus, config=options,
+                            juju_controller=None, suite=[])
+    view_controller = None
+    if options.skin == "tui":
+        screen = raw_display.Screen()
+        screen.set_terminal_properties(256)
+        view = TUIView(bus, context, screen)
+        view_controller = MainLoop(
+            view, palette, screen=screen,
+            event_loop=AsyncioEventLoop(loop=loop),
+            unhandled_input=view.input_handler)
+        view_controller.start()
+    else:
+        RawView(bus, context)
+    if options.xunit:
+        XUnitView(bus, context, options.xunit)
+
+    async def run():
+        await replay(bus, options.journal, options.speed)
+        if view_controller is None:
+            bus.shutdown()
+
+    try:
+        loop.create_task(run())
+        loop.run_until_complete(bus.notify(False))
+    finally:
+        if view_controller is not None:
+            view_controller.stop()
+        loop.close()
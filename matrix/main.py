@@ -5,12 +5,13 @@ import logging.config
 from pathlib import Path
 from pkg_resources import resource_filename
 import os
-import yaml
 import sys
 
 from .bus import Bus, set_default_bus
 from . import config
+from . import journal
 from . import rules
+from . import simulate
 from . import utils
 
 
@@ -54,9 +55,7 @@ def add_bundle_opts(options, parser):
     if not test_yaml_file.exists():
         return options
 
-    with test_yaml_file.open() as test_yaml:
-        test_yaml = test_yaml.read()
-        test_yaml = yaml.load(test_yaml)
+    test_yaml = utils.load_yaml(test_yaml_file)
 
     bundle_opts = test_yaml.get('matrix')
 
@@ -115,6 +114,15 @@ def setup(matrix, args=None):
                "    Run only ./tests/matrix_extra.yaml:\n"
                "\n"
                "        $ matrix -DB tests/matrix_extra.yaml\n"
+               "\n"
+               "    Check how the suites would be scheduled, with made up "
+               "task durations and no controller:\n"
+               "\n"
+               "        $ matrix --simulate tasks.yaml\n"
+               "\n"
+               "    Replay the events recorded by a previous run:\n"
+               "\n"
+               "        $ matrix replay matrix.journal\n"
                "\n",
     )
     parser.add_argument("-c", "--controller", default=None,
@@ -150,7 +158,42 @@ def setup(matrix, args=None):
     parser.add_argument("-x", "--xunit", default=None, metavar='FILENAME',
                         help="Create an XUnit report file")
     parser.add_argument("-F", "--fail-fast", action="store_true")
+    parser.add_argument("-j", "--jobs", dest="max_jobs", default=1, type=int,
+                        help="Run up to this many tests at once, each on "
+                             "its own model (ignored with --model)")
+    parser.add_argument("-P", "--model-pool", default=0, type=int,
+                        help="Create up to this many models ahead of the "
+                             "tests that need them, in the background")
+    parser.add_argument("--max-teardowns", default=4, type=int,
+                        help="Crashdump and destroy at most this many "
+                             "models at once, in the background")
+    parser.add_argument("--shards", default=0, type=int,
+                        help="Split the selected tests across this many "
+                             "matrix processes, balanced by the durations "
+                             "recorded by earlier runs")
+    parser.add_argument("--shard-controllers", nargs="*", default=[],
+                        metavar="CONTROLLER",
+                        help="Controllers to spread the shards over "
+                             "(default: --controller for all of them)")
+    parser.add_argument("--shard-command", default=None,
+                        help="Command to start a shard's matrix process "
+                             "with (default: this python running "
+                             "matrix.main)")
+    parser.add_argument("--reuse-deployment", action="store_true",
+                        help="Run the tests which deploy the bundle the same "
+                             "way one after the other on one deployment, "
+                             "scaled back to the bundle's shape between "
+                             "tests, rather than deploying it for each test")
+    parser.add_argument("-R", "--resume", action="store_true",
+                        help="Resume the run recorded in checkpoint.json in "
+                             "the output dir: skip the tests it finished and "
+                             "continue the ones it was running on their "
+                             "models")
     parser.add_argument("-i", "--interval", default=5.0, type=float)
+    parser.add_argument("--max-queue", default=10000, type=int,
+                        help="Bound on queued bus events. Once reached, log "
+                             "events are merged or dropped; control events "
+                             "are always kept. 0 means unbounded.")
     parser.add_argument("-p", "--path", default=Path.cwd(), type=Path,
                         help="Path to local bundle to test "
                              "(defaults to current directory)")
@@ -161,6 +204,11 @@ def setup(matrix, args=None):
     parser.add_argument("-B", "--no-bundle-suite", dest="bundle_suite",
                         default="tests/matrix.yaml", action="store_false",
                         help="Do not include the suite provided by the bundle")
+    parser.add_argument("-J", "--no-journal", dest="journal",
+                        default="matrix.journal", action="store_false",
+                        help="Do not record the run's events to "
+                             "matrix.journal in the output dir. A journal "
+                             "can be viewed with 'matrix replay JOURNAL'.")
     parser.add_argument("additional_suites", nargs="*",
                         help="Additional suites to be merged with the "
                              "default suite before running")
@@ -171,29 +219,55 @@ def setup(matrix, args=None):
     parser.add_argument("-n", "--chaos_num", default=5)
     parser.add_argument("-o", "--chaos_output",
                         default="chaos_plan_{model_name}.yaml")
+    parser.add_argument("--explain-plan", action="store_true",
+                        help="Show the expected schedule of each selected "
+                             "test, based on the rule durations recorded "
+                             "by earlier runs, and exit")
+    parser.add_argument("--simulate", nargs="?", const=True, default=None,
+                        metavar="FILE",
+                        help="Run the suites in virtual time against a fake "
+                             "controller, with tasks that take the durations "
+                             "and have the outcomes given in FILE (see "
+                             "matrix.simulate), and show the expected "
+                             "timeline and exit code")
     parser.add_argument("-H", "--ha", action='store_true',
                         help=("Treat this bundle as a 'high availabilty' "
                               "bundle. This means that tests that gate on "
                               "'ha_only' will gate on this bundle."))
 
     options = parser.parse_args(args, namespace=matrix)
+    options.argv = list(args) if args is not None else sys.argv[1:]
     options = add_bundle_opts(options, parser)
 
     if not utils.valid_bundle_or_spell(options.path):
         parser.error('Invalid bundle directory: %s' % options.path)
+    if options.simulate:
+        # the timeline is printed, and there is nothing to shard
+        options.skin = "raw"
+        options.shards = 0
 
     configLogging(options)
     return options
 
 
 def main(args=None):
-    loop = asyncio.get_event_loop()
+    if args is None:
+        args = sys.argv[1:]
+    if args and args[0] == "replay":
+        return journal.replay_main(args[1:])
+
+    if any(a == "--simulate" or a.startswith("--simulate=") for a in args):
+        loop = simulate.VirtualTimeLoop()
+        asyncio.set_event_loop(loop)
+    else:
+        loop = asyncio.get_event_loop()
     bus = Bus(loop=loop)
     # logging resolves default bus from the module
     set_default_bus(bus)
 
     matrix = rules.RuleEngine(bus=bus)
     options = setup(matrix, args)
+    bus.maxsize = options.max_queue
     loop.set_debug(options.log_level == logging.DEBUG)
 
     try:
@@ -203,3 +277,7 @@ def main(args=None):
         loop.close()
         if matrix.exit_code:
             sys.exit(matrix.exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import asyncio
-import fnmatch
 import functools
 import json
 import logging
@@ -10,6 +9,7 @@ import attr
 from pathlib import Path
 
 from . import utils
+from .state import StateStore
 
 PENDING = "pending"
 RUNNING = "running"
@@ -27,19 +27,42 @@ class TestFailure(Exception):
         self.message = message or "Test Failure"
 
 
+class TestTimeout(TestFailure):
+    "Indicate that a test or rule ran past its timeout, this always gates"
+
+
 class InfraFailure(Exception):
     "Indicate that we have run into an unexpected error while running a test."
     pass
 
 
-@attr.s
+@attr.s(slots=True)
 class Event:
     """A local or remote event tied to the context timeline."""
     time = attr.ib(init=False, convert=float)
-    created = attr.ib(init=False)
-    origin = attr.ib(init=False)   # subsystem that spawned the event
-    kind = attr.ib(init=False)     # a string indicating the kind of event
+    origin = attr.ib(init=False, default=None)  # subsystem that spawned it
+    kind = attr.ib(init=False, default=None)    # string indicating the kind
     payload = attr.ib(default=None)  # object for payload, ex: kind based map
+    test = attr.ib(init=False, default=None)    # name of the test, if any
+    # Where the event was dispatched from. The bus stores the raw
+    # (code, lineno) pair and it is only formatted when ``created`` is read.
+    _created = attr.ib(init=False, default=None, repr=False)
+
+    @property
+    def created(self):
+        created = self._created
+        if isinstance(created, tuple):
+            code, lineno = created
+            created = self._created = "{}:{}:{}::{}".format(
+                    __package__,
+                    Path(code.co_filename),
+                    lineno,
+                    code.co_name)
+        return created
+
+    @created.setter
+    def created(self, value):
+        self._created = value
 
     def __str__(self):
         return "{}:{}:: {} {}\n{!s}".format(
@@ -61,38 +84,57 @@ class Context:
     bus = attr.ib(repr=False)
     suite = attr.ib()
     timeline = attr.ib(init=False, default=attr.Factory(Timeline))
-    # Task -> State + (any custom states)
-    states = attr.ib(init=False, default=attr.Factory(dict))
+    # Task -> State + (any custom states), see matrix.state
+    states = attr.ib(init=False, default=attr.Factory(StateStore))
     # Top level config
     config = attr.ib(repr=False)
     # Resolve rule.task handlers
     tasks = attr.ib(default=attr.Factory(dict), repr=False, init=False)
-    # Task cancellation callbacks
-    # XXX: use an event for this?
-    waiters = attr.ib(default=attr.Factory(dict), repr=False, init=False)
     juju_controller = attr.ib(repr=False)
     juju_model = attr.ib(repr=False, init=False, default=None)
     test = attr.ib(repr=False, init=False)
+    # Bus bridge for task processes, see matrix.bridge
+    bridge = attr.ib(repr=False, init=False, default=None)
+    # Results of background model teardowns, see matrix.pool.Reaper
+    teardowns = attr.ib(default=attr.Factory(list), repr=False, init=False)
 
     def set_state(self, name, value):
         old_value = self.states.get(name, _marker)
+        # wakes and cancels whatever watches this state
         self.states[name] = value
-        # Cancel any tasks blocked on this state/value
-        # combination
-        if self.waiters:
-            waiters = self.waiters.get(".".join((name, value)), [])
-            if COMPLETE == value:
-                # allow "until: foo" as a shorthand for "until: foo.complete"
-                waiters.extend(self.waiters.get(name, []))
-            for t, owner in waiters:
-                t.cancel()
         if old_value != value:
+            test = getattr(self, "test", None)
             self.bus.dispatch(kind="state.change",
                               origin="context",
+                              test=test.name if test else None,
                               name=name,
                               old_value=old_value,
                               new_value=value)
 
+    def fork(self, test):
+        """
+        Return a new context for running ``test`` alongside others. It
+        shares the loop, bus, config, controller, resolved tasks and teardown
+        results but has its own states, timeline and model.
+
+        """
+        context = Context(loop=self.loop, bus=self.bus, suite=[test],
+                          config=self.config,
+                          juju_controller=self.juju_controller)
+        context.tasks = self.tasks
+        context.bridge = self.bridge
+        context.teardowns = self.teardowns
+        context.test = test
+        return context
+
+    def wait_for_states(self, names):
+        """
+        Return a future which resolves with the name of the first of
+        ``names`` to be set.
+
+        """
+        return self.states.changed(names, loop=self.loop)
+
     def __str__(self):
         return "Context object"
 
@@ -156,12 +198,15 @@ class Task:
             return await callback(context, cmd, rule, event)
 
         # XXX: handle in loop?
+        from .bus import glob
         on_cond = rule.select_one("on")
 
-        def is_cond(e):
-            return (fnmatch.fnmatch(e.kind, on_cond.name) and
-                    rule.lifecycle(context) == RUNNING)
-        return context.bus.subscribe(event_wrapper, is_cond)
+        def is_running(e):
+            return rule.lifecycle(context) == RUNNING
+        # Tasks run from "on" events can take a long time, give them their
+        # own queue so they don't hold up the rest of the bus.
+        return context.bus.subscribe(
+            event_wrapper, glob(on_cond.name), is_running, isolated=True)
 
     async def execute(self, context, rule):
         # create a log object for context
@@ -204,21 +249,26 @@ class Task:
                 recurse=True,
                 filter=attr_filter)
         data['args'] = self.args
+        data['states_version'] = context.states.version
         if event:
             data['event'] = attr.asdict(
                     event, recurse=True,
                     filter=attr_filter)
+            data['event']['created'] = event.created
 
         data = json.dumps(data).encode("utf-8")
         path = "{}:{}".format(str(context.config.path),
                               os.environ.get("PATH", ""))
+        env = {"PATH": path}
+        if context.bridge:
+            env.update(context.bridge.environ())
         try:
             p = await asyncio.create_subprocess_exec(
                     str(cmd),
                     stdin=asyncio.subprocess.PIPE,
                     stdout=asyncio.subprocess.PIPE,
                     stderr=asyncio.subprocess.PIPE,
-                    env={"PATH": path}
+                    env=env
                     )
             stdout, stderr = await p.communicate(data)
             log.debug("Exec %s -> %d", cmd, p.returncode)
@@ -304,11 +354,20 @@ class Condition:
     def name(self):
         return self.statement
 
+    @property
+    def state(self):
+        """The name of the state in context.states this condition reads."""
+        if "." in self.statement:
+            return self.statement.rsplit(".", 1)[0]
+        return self.statement
+
 
 @attr.s
 class Rule:
     task = attr.ib()
     conditions = attr.ib(default=attr.Factory(list))
+    # seconds the rule may run for once entered
+    timeout = attr.ib(default=None)
 
     @property
     def name(self):
@@ -0,0 +1,102 @@
+import asyncio
+import collections
+import logging
+
+log = logging.getLogger("matrix")
+
+
+class ModelPool:
+    """
+    Keep up to ``size`` models being created ahead of the tests that will
+    use them.
+
+    ``create`` is a coroutine function returning a new, connected model and
+    ``destroy`` a coroutine function taking one. Models are handed out in
+    the order they were requested, each ``get`` immediately starts work on
+    a replacement so the pool stays full while the test runs.
+
+    """
+    def __init__(self, loop, size, create, destroy):
+        self.loop = loop
+        self.size = size
+        self.create = create
+        self.destroy = destroy
+        self._pending = collections.deque()
+        self._closed = False
+
+    def __len__(self):
+        return len(self._pending)
+
+    def fill(self):
+        while not self._closed and len(self._pending) < self.size:
+            self._pending.append(self.loop.create_task(self.create()))
+
+    async def get(self):
+        if self._closed:
+            raise RuntimeError("Model pool is closed")
+        if not self._pending:
+            self._pending.append(self.loop.create_task(self.create()))
+        task = self._pending.popleft()
+        self.fill()
+        return await task
+
+    async def close(self):
+        """Destroy the models nobody asked for, including ones in flight."""
+        self._closed = True
+        pending, self._pending = list(self._pending), collections.deque()
+        if not pending:
+            return
+        await asyncio.wait(pending)
+        for task in pending:
+            if task.cancelled() or task.exception() is not None:
+                continue
+            juju_model = task.result()
+            try:
+                await self.destroy(juju_model)
+            except Exception:
+                log.exception("Error destroying pooled model %s",
+                              juju_model.info.name)
+
+
+class Reaper:
+    """
+    Tear models down in the background, at most ``limit`` at a time.
+
+    Each submitted coroutine returns a dict describing what it did, which
+    is collected (with the time taken) in ``results`` for the summary at
+    the end of the run.
+
+    """
+    def __init__(self, loop, limit=4, results=None):
+        self.loop = loop
+        self.slots = asyncio.Semaphore(max(limit, 1))
+        self.results = [] if results is None else results
+        self.tasks = set()
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def submit(self, name, coro):
+        task = self.loop.create_task(self._run(name, coro))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def _run(self, name, coro):
+        start = self.loop.time()
+        async with self.slots:
+            try:
+                result = await coro
+            except Exception as e:
+                log.exception("Error tearing down %s", name)
+                result = {"error": str(e)}
+        result["model"] = name
+        result["duration"] = self.loop.time() - start
+        self.results.append(result)
+        return result
+
+    async def wait(self):
+        """Wait for every teardown submitted so far."""
+        if self.tasks:
+            log.info("Waiting for %d model teardown(s)", len(self.tasks))
+            await asyncio.wait(list(self.tasks))
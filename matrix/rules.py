@@ -1,8 +1,11 @@
 import asyncio
+import collections
 import fnmatch
 import functools
 import io
+import json
 import logging
+import operator
 from pathlib import Path
 import os
 import sys
@@ -14,14 +17,25 @@ import juju.controller
 import juju.model
 import urwid
 
+from .bridge import BusBridge
+from .bundle import restore_shape
 from .bus import eq
+from .checkpoint import Checkpoint
+from .graph import RuleGraph, format_plan, load_durations, save_durations
+from .journal import Journal
 from . import model
 from .model import RUNNING, PAUSED
+from .pool import ModelPool, Reaper
+from . import shard
+from .shard import Coordinator
+from . import simulate
+from .timers import Timers
 from . import utils
 from .view import TUIView, RawView, XUnitView, NoopViewController, palette
 
 
 log = logging.getLogger("matrix")
+DEPLOY_TASK = "matrix.tasks.deploy"
 _marker = object()
 
 
@@ -37,6 +51,10 @@ class Test:
     name = attr.ib(default=attr.Factory(pet_test))
     description = attr.ib(default="")
     rules = attr.ib(default=attr.Factory(list))
+    # seconds the rules of the test may run for
+    timeout = attr.ib(default=None)
+    # compiled by from_v1, see matrix.graph
+    graph = attr.ib(default=None, repr=False, cmp=False)
 
     def result(self, context, value=_marker):
         name = "test.%s" % self.name
@@ -63,6 +81,9 @@ class Test:
         desc = data.get("description")
         if desc:
             self.description = desc
+        timeout = data.get("timeout")
+        if timeout:
+            self.timeout = float(timeout)
 
         for d in data['rules']:
             aspec = d.get("do")
@@ -91,7 +112,13 @@ class Test:
                                 mode=phase,
                                 statement=v))
 
-            self.rules.append(model.Rule(task, conditions))
+            timeout = d.get("timeout")
+            if timeout:
+                timeout = float(timeout)
+            self.rules.append(model.Rule(task, conditions, timeout))
+
+        self.graph = RuleGraph(self.name, self.rules)
+        self.graph.warn()
 
     def match(self, context):
         """Return list of matching rules given context"""
@@ -120,16 +147,47 @@ class Suite(list):
 
 
 def load_suites(filenames, factory=Suite):
-    spec = {'tests': []}
-    for filename in filenames:
-        log.info("Parsing %s", filename)
-        with open(filename) as fp:
-            utils.merge_spec(spec, yaml.load(fp))
-
+    def merge():
+        spec = {'tests': []}
+        for filename in filenames:
+            log.info("Parsing %s", filename)
+            with open(filename) as fp:
+                utils.merge_spec(spec, utils.parse_yaml(fp))
+        return spec
+
+    # the merged spec is cached by the contents of the suites
+    spec = utils.cached(utils.content_key("suites", *filenames), merge)
     rules = factory.from_spec(spec)
     return rules
 
 
+def deploy_rule(test):
+    """The rule deploying the bundle for ``test``, if it has one."""
+    for rule in test.rules:
+        if rule.task.command == DEPLOY_TASK:
+            return rule
+    return None
+
+
+def group_tests(tests):
+    """
+    Group ``tests`` which deploy the bundle the same way, so that they can
+    run one after the other on the same deployment. Groups keep the order
+    their first test had, tests without a deploy rule are on their own.
+
+    """
+    groups = collections.OrderedDict()
+    for test in tests:
+        rule = deploy_rule(test)
+        if rule is None:
+            key = ("test", test.name)
+        else:
+            key = ("deploy", json.dumps(rule.task.args, sort_keys=True,
+                                        default=str))
+        groups.setdefault(key, []).append(test)
+    return list(groups.values())
+
+
 class ShutdownException(Exception):
     "Indicate we need to shut down processing"
     pass
@@ -141,9 +199,23 @@ class RuleEngine:
         self.bus = bus
         self._exc = None
         self.jobs = []
+        self.pool = None
+        self.reaper = None
+        self.checkpoint = None
+        # test name -> rule name -> seconds, see matrix.graph
+        self.durations = {}
+        # deadlines of running tests and rules
+        self.timers = Timers(self.loop)
+        # task -> reason, for tasks cancelled by their deadline
+        self.expired = {}
+        # command line, passed on to the workers of a sharded run
+        self.argv = None
         self._reported = False
         self._should_run = True
         self.exit_code = None
+        # --simulate: True, or the file describing the simulated tasks
+        self.simulate = None
+        self.reuse_deployment = False
 
     def load_suite(self):
         filenames = []
@@ -163,16 +235,24 @@ class RuleEngine:
             log.critical('No test suites to run')
 
         tests = load_suites(filenames)
+        self.durations = load_durations(self.durations_file)
 
         if not self.path.samefile(Path.cwd()):
             sys.path.append(str(self.path))  # for custom tasks
 
+        if self.simulate:
+            controller = simulate.FakeController(self.loop)
+        else:
+            controller = juju.controller.Controller(self.loop)
         context = model.Context(
                 loop=self.loop,
                 bus=self.bus,
                 config=self,
-                juju_controller=juju.controller.Controller(self.loop),
+                juju_controller=controller,
                 suite=tests)
+        if self.simulate:
+            simulate.install(context, self.simulate
+                             if isinstance(self.simulate, str) else None)
         return context
 
     async def rule_runner(self, rule, context):
@@ -182,6 +262,15 @@ class RuleEngine:
                 payload=dict(rule=rule, result=None),
                 origin="matrix",
         )
+        if rule.complete(context):
+            # completed before the resumed run stopped
+            log.info("Rule %s is already complete", rule.name)
+            self.bus.dispatch(
+                    kind="rule.done",
+                    payload=dict(rule=rule, result=True),
+                    origin=rule.name
+                    )
+            return True
         subscription = None
         period = None
         if rule.has("periodic"):
@@ -193,16 +282,28 @@ class RuleEngine:
         while True:
             # ENTER
             try:
-                if not rule.match(context) or subscription is not None:
-                    if not subscription:
-                        log.debug("rule '%s' blocked on %s. context: %s ",
-                                  rule.name,
-                                  rule.pending(context),
-                                  context.states)
-                    await asyncio.sleep(self.interval, loop=self.loop)
+                if not rule.match(context):
+                    pending = rule.pending(context)
+                    log.debug("rule '%s' blocked on %s. context: %s ",
+                              rule.name,
+                              pending,
+                              context.states)
+                    # Sleep until one of the states we're blocked on
+                    # changes, then re-evaluate
+                    await context.wait_for_states(
+                        [c.state for c in pending])
                     continue
                 break
             except asyncio.CancelledError:
+                reason = self.expired_reason()
+                if reason:
+                    # the test ran out of time before this rule could start
+                    self.bus.dispatch(
+                            kind="rule.done",
+                            payload=dict(rule=rule, result=False),
+                            origin=rule.name
+                            )
+                    raise model.TestTimeout(rule.task, reason)
                 # Handle a special case where the rule was never entered and
                 # would be cancelled by having its "until" condition met.
                 # In this case we track the event, run the action
@@ -214,6 +315,17 @@ class RuleEngine:
         if not self._should_run:
             raise ShutdownException
 
+        started = self.loop.time()
+        if rule.timeout:
+            task = utils.current_task(self.loop)
+            test = getattr(context, "test", None)
+            timer = self.timers.call_later(
+                rule.timeout, self.expire, [task], "rule.timeout",
+                "Rule {} timed out after {}s".format(
+                    rule.name, rule.timeout),
+                test.name if test else None,
+                dict(rule=rule, timeout=rule.timeout))
+            task.add_done_callback(lambda t: timer.cancel())
         while self._should_run:
             try:
                 rule.lifecycle(context, RUNNING)
@@ -233,6 +345,10 @@ class RuleEngine:
                     # The rules conditions were met we should spawn
                     # the task and record states for it in context
                     result = await rule.execute(context)
+                    # tasks treat being cancelled as done, see until
+                    reason = self.expired_reason()
+                    if reason:
+                        raise model.TestTimeout(rule.task, reason)
 
                 # EXIT
                 # An "until" rule will get cancelled when its condition is
@@ -252,10 +368,13 @@ class RuleEngine:
                     # such that we don't progress testing until we've assessed
                     # system health
                     rule.lifecycle(context, PAUSED)
-                    await asyncio.sleep(period, loop=self.loop)
+                    await asyncio.sleep(period)
                 else:
-                    await asyncio.sleep(self.interval, loop=self.loop)
+                    await asyncio.sleep(self.interval)
             except (model.TestFailure, asyncio.CancelledError) as e:
+                reason = self.expired_reason()
+                if reason:
+                    e = model.TestTimeout(rule.task, reason)
                 rule.complete(context, True)
                 if subscription:
                     self.bus.unsubscribe(subscription)
@@ -272,6 +391,12 @@ class RuleEngine:
 
         if result is None:
             log.warn("Rule for %s should return bool for success", rule.name)
+        test = getattr(context, "test", None)
+        if test is not None:
+            self.durations.setdefault(test.name, {})[rule.name] = \
+                self.loop.time() - started
+            if self.checkpoint is not None:
+                self.checkpoint.update(test, context.states)
 
         self.bus.dispatch(
                 kind="rule.done",
@@ -288,32 +413,64 @@ class RuleEngine:
         self.bus.dispatch(
                 kind="test.start",
                 payload=test,
+                test=test.name,
                 origin="matrix")
-        self.jobs.clear()
-        for rule in test.rules:
+        jobs = []
+        watches = []
+        rules = test.rules
+        if test.graph is not None:
+            # start the rules heading the longest chains of work first
+            rules = test.graph.prioritized(self.durations.get(test.name))
+        for rule in rules:
             task = self.loop.create_task(
                     self.rule_runner(rule, context))
+            self.bus.tag_task(task, test.name)
+            jobs.append(task)
             self.jobs.append(task)
             untils = rule.select("until")
             if untils:
                 # The rule should terminate when a state is set, we want this
                 # to happen ASAP and not at the end of some long (or infinite)
-                # tasks completion. For this to happen we push the task objects
-                # onto a list of waiters in the context. When states are set we
-                # check that list and on a match cancel() each task that was
-                # "until" the state was set.
+                # tasks completion. For this to happen we watch the state and
+                # cancel() the task once it is set to the value the rule was
+                # "until".
                 for u in untils:
-                    w = context.waiters.setdefault(u.statement, [])
+                    if "." in u.statement:
+                        value = u.statement.rsplit(".", 1)[1]
+                    else:
+                        # "until: foo" is short for "until: foo.complete"
+                        value = model.COMPLETE
                     log.debug(
-                            "Adding task to wait list on %s for rule %s",
-                            u.name, rule.name)
-                    w.append((task, rule))
+                            "Cancelling rule %s once %s is %s",
+                            rule.name, u.state, value)
+                    watches.append(context.states.watch(
+                        u.state,
+                        functools.partial(self._cancel_until, task),
+                        functools.partial(operator.eq, value)))
+
+        timer = None
+        if test.timeout:
+            timer = self.timers.call_later(
+                test.timeout, self.expire, jobs, "test.timeout",
+                "Test {} timed out after {}s".format(
+                    test.name, test.timeout),
+                test.name,
+                dict(test=test, timeout=test.timeout))
 
         # rule_runner will run each rule to completion
         # (either success or failure) and then terminate here
-        done, pending = await asyncio.wait(
-            self.jobs, loop=self.loop,
-            return_when=asyncio.FIRST_EXCEPTION)
+        try:
+            done, pending = await asyncio.wait(
+                jobs, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            if timer:
+                timer.cancel()
+            for watch in watches:
+                context.states.unwatch(watch)
+            for task in jobs:
+                self.jobs.remove(task)
+                if task.done():
+                    self.expired.pop(task, None)
         if pending:
             # We terminated with things still running
             # this could be a test failure or poor rule formation.
@@ -324,8 +481,9 @@ class RuleEngine:
         exceptions = [(t, t.exception()) for t in done if t.exception()]
         if exceptions:
             for t, e in exceptions:
-                if type(e) is model.TestFailure:
-                    if utils.should_gate(context=context, task=e.task):
+                if isinstance(e, model.TestFailure):
+                    if isinstance(e, model.TestTimeout) or \
+                            utils.should_gate(context=context, task=e.task):
                         log.error(
                             "Setting exit code 101 due to gating "
                             "TestFailure.")
@@ -354,11 +512,82 @@ class RuleEngine:
                     return False
             return True
 
-        self.bus.subscribe(context.timeline.append,
-                           allow_event)
+        self.bus.subscribe(context.timeline.extend,
+                           allow_event, batch=True)
 
         self.bus.subscribe(self.handle_shutdown, eq("shutdown"))
+        self.bus.subscribe(self.report_stats, eq("test.finish"))
+        if self.simulate:
+            simulate.SimulationReport(self.bus, self)
+        else:
+            self.bus.subscribe(self.record_durations, eq("test.finish"))
+
+        self.select_tests(context)
+
+        self.bus.dispatch(
+                origin="matrix",
+                kind="test.schedule",
+                payload=context.suite)
+        self.reaper = Reaper(self.loop, self.max_teardowns,
+                             context.teardowns)
+        path = Path(self.output_dir or ".", "checkpoint.json")
+        if self.simulate:
+            self.checkpoint = None
+        elif self.resume:
+            self.checkpoint = Checkpoint.load(path)
+            self.exit_code = self.checkpoint.exit_code
+        else:
+            self.checkpoint = Checkpoint(path)
+        max_jobs = self.max_jobs
+        if max_jobs > 1 and self.model:
+            log.warning("--jobs needs a model per test, ignoring it as "
+                        "--model %s was given", self.model)
+            max_jobs = 1
+        if self.reuse_deployment and not self.model:
+            groups = group_tests(context.suite)
+        else:
+            groups = [[test] for test in context.suite]
+        if max_jobs > 1:
+            slots = asyncio.Semaphore(max_jobs)
+
+            async def run_slot(group):
+                async with slots:
+                    await self.run_group(context.fork(group[0]), group,
+                                         timeline=True)
+
+            await asyncio.gather(*[self.loop.create_task(run_slot(group))
+                                   for group in groups])
+        else:
+            for group in groups:
+                await self.run_group(context, group)
+        await self.reaper.wait()
+        self.bus.dispatch(
+                origin="matrix",
+                kind="test.finish",
+                payload=context
+        )
+
+    def expire(self, tasks, kind, reason, test, payload):
+        """Cancel ``tasks`` whose deadline has passed."""
+        log.error(reason)
+        for task in tasks:
+            if not task.done():
+                self.expired[task] = reason
+                task.cancel()
+        self.bus.dispatch(
+            kind=kind,
+            origin="matrix",
+            test=test,
+            payload=payload)
 
+    def _cancel_until(self, task, key, value):
+        task.cancel()
+
+    def expired_reason(self):
+        """Why the current task was cancelled, if its deadline passed."""
+        return self.expired.pop(utils.current_task(self.loop), None)
+
+    def select_tests(self, context):
         # reduce the test set to those matching pattern
         suite = []
         for t in context.suite:
@@ -368,33 +597,143 @@ class RuleEngine:
                     break
         context.suite = suite
 
-        self.bus.dispatch(
-                origin="matrix",
-                kind="test.schedule",
-                payload=context.suite)
+    def print_plan(self, context):
+        """Print the expected schedule of each selected test."""
+        self.select_tests(context)
         for test in context.suite:
+            if test.graph is None:
+                continue
+            print(format_plan(test, self.durations.get(test.name)))
+            print()
+        if not self.durations:
+            print("No durations recorded in {} yet, rules are shown in "
+                  "dependency order".format(self.durations_file))
+
+    async def run_group(self, context, group, timeline=False):
+        """
+        Run the tests of ``group`` one after the other, each on the model
+        the previous one deployed unless it failed.
+
+        """
+        for i, test in enumerate(group):
             context.test = test
-            success = False
-            try:
+            await self.run_test(context, test, timeline=timeline,
+                                keep=i < len(group) - 1)
+
+    async def run_test(self, context, test, timeline=False, keep=False):
+        """
+        Run a single test on a model of its own, then clean up. With
+        ``timeline`` the context collects the events tagged with the test.
+        With ``keep`` the model is left on the context for the next test
+        if this one succeeds.
+
+        """
+        task = utils.current_task(self.loop)
+        if task is not None:
+            self.bus.tag_task(task, test.name)
+        subscription = None
+        if timeline:
+            subscription = self.bus.subscribe(
+                context.timeline.extend,
+                lambda e: e.test == test.name,
+                batch=True)
+        if self.checkpoint is not None and \
+                test.name in self.checkpoint.finished:
+            success = self.checkpoint.finished[test.name]
+            log.info("Skipping %s, it finished in the resumed run",
+                     test.name)
+            self.bus.dispatch(
+                kind="test.complete",
+                origin="matrix",
+                test=test.name,
+                payload=dict(test=test, result=success))
+            return success
+
+        success = False
+        try:
+            if not await self.resume_model(context, test) and \
+                    not await self.reuse_model(context, test):
                 await self.add_model(context)
-            except Exception as e:
-                log.exception('Error adding model: %s', e)
-                self.exit_code = 200
-            else:
-                success = await self.run_once(context, test)
-            finally:
-                log.debug("%s Complete %s %s",
-                          test.name, success, context.states)
-                self.bus.dispatch(
-                    kind="test.complete",
-                    origin="matrix",
-                    payload=dict(test=test, result=success))
-                await self.cleanup(context)
-        self.bus.dispatch(
+            if self.checkpoint is not None:
+                self.checkpoint.start(test, context.juju_model.info.name
+                                      if context.juju_model else None)
+        except Exception as e:
+            log.exception('Error adding model: %s', e)
+            self.exit_code = 200
+        else:
+            success = await self.run_once(context, test)
+        finally:
+            log.debug("%s Complete %s %s",
+                      test.name, success, context.states)
+            self.bus.dispatch(
+                kind="test.complete",
                 origin="matrix",
-                kind="test.finish",
-                payload=context
-        )
+                test=test.name,
+                payload=dict(test=test, result=success))
+            if self.checkpoint is not None and self._should_run:
+                self.checkpoint.finish(test, success, self.exit_code)
+            await self.cleanup(context,
+                               keep=keep and success and self._should_run)
+            if subscription:
+                self.bus.unsubscribe(subscription)
+        return success
+
+    async def resume_model(self, context, test):
+        """
+        Pick ``test`` up where the resumed run left it: reconnect to the
+        model it was running on and restore the states of the rules it had
+        completed. Returns False if the test has to start over.
+
+        """
+        if self.checkpoint is None:
+            return False
+        running = self.checkpoint.running.get(test.name)
+        if not running:
+            return False
+        if self.model:
+            await self.add_model(context)
+        elif running.get("model"):
+            try:
+                await self.add_model(context, running["model"])
+            except Exception as e:
+                log.warning("Unable to reconnect to model %s, running %s "
+                            "from the start: %s", running["model"],
+                            test.name, e)
+                context.juju_model = None
+                return False
+        else:
+            return False
+        log.info("Resuming %s on model %s", test.name,
+                 context.juju_model.info.name)
+        context.states.update(running["states"])
+        return True
+
+    async def reuse_model(self, context, test):
+        """
+        Run ``test`` on the model left on the context by the previous test
+        of its group: scale the model back to the bundle's shape and mark
+        the deploy rule complete. Returns False (after handing the model to
+        the reaper) if the test needs a model of its own.
+
+        """
+        if context.juju_model is None:
+            return False
+        rule = deploy_rule(test)
+        name = context.juju_model.info.name
+        try:
+            restored = self.simulate or await restore_shape(
+                context.juju_model, self.path, log)
+        except Exception as e:
+            log.warning("Unable to restore model %s: %s", name, e)
+            restored = False
+        if not restored or rule is None:
+            log.info("Not reusing model %s for %s", name, test.name)
+            await self.cleanup(context)
+            return False
+        log.info("Reusing the deployment on model %s for %s",
+                 name, test.name)
+        rule.complete(context, True)
+        return True
 
     async def connect_controller(self, context):
         '''
@@ -407,71 +746,121 @@ class RuleEngine:
         else:
             await context.juju_controller.connect_current()
 
-    async def cleanup(self, context, max_retries=10, backoff_const=0.01):
+    async def cleanup(self, context, max_retries=10, backoff_const=0.01,
+                      keep=False):
         '''
-        Clean up our context, dump testing artifacts (if any), and destroy
-        the model that we created for the given context.
+        Clean up our context and hand the model we created for it to the
+        reaper, which dumps testing artifacts (if any) and destroys the
+        model in the background while the next test runs. With ``keep``
+        the model stays on the context.
 
         '''
         context.states.clear()
-        context.waiters.clear()
-        try:
-            if self.model:
-                model_name = self.model
-            elif context.juju_model:
-                model_name = context.juju_model.info.name
-            else:
-                model_name = None
-            if self.exit_code and model_name:
-                await utils.crashdump(
+        context.states.watches.clear()
+        if keep and context.juju_model is not None:
+            return
+        juju_model = None
+        if self.model:
+            model_name = self.model
+        elif context.juju_model:
+            juju_model = context.juju_model
+            model_name = juju_model.info.name
+            # the next test gets a model of its own
+            context.juju_model = None
+            context.bus.dispatch(
+                origin="model",
+                payload=None,
+                kind="model.new",
+            )
+        else:
+            model_name = None
+        dump = bool(self.exit_code and model_name and not self.simulate)
+        if self.keep_models:
+            juju_model = None
+        if not dump and juju_model is None:
+            return
+        teardown = self.teardown(context, model_name, juju_model, dump,
+                                 max_retries, backoff_const)
+        if self.reaper is None:
+            await teardown
+            return
+        job = self.reaper.submit(model_name, teardown)
+        if self.model:
+            # the next test reuses this model, dump it before it changes
+            await job
+
+    async def teardown(self, context, model_name, juju_model, dump,
+                       max_retries=10, backoff_const=0.01):
+        result = {"crashdump": None, "destroyed": None}
+        if dump:
+            try:
+                result["crashdump"] = await utils.crashdump(
                     log=log,
                     model_name=model_name,
                     controller=context.config.controller,
                     directory=context.config.output_dir
                 )
-        except Exception as e:
-            log.exception("Error while running crashdump.")
-        if not self.keep_models:
-            retries = 0
-            while True:
-                try:
-                    await self.destroy_model(context)
+            except Exception as e:
+                log.exception("Error while running crashdump.")
+                result["crashdump"] = False
+        if juju_model is None:
+            return result
+        retries = 0
+        while True:
+            try:
+                await self._destroy_model(context.juju_controller,
+                                          juju_model)
+                log.info("Model %s destroyed", model_name)
+                result["destroyed"] = True
+                break
+            except Exception as e:
+                log.exception('Error destroying model: %s', e)
+                retries += 1
+                if retries >= max_retries:
+                    result["destroyed"] = False
                     break
-                except Exception as e:
-                    log.exception('Error destroying model: %s', e)
-                    retries += 1
-                    if retries >= max_retries:
-                        break
-                    else:
-                        wait = pow(2, retries) * backoff_const
-                        log.error('Retrying in %s seconds', wait)
-                        await asyncio.sleep(wait)
-                        await self.connect_controller(context)
+                else:
+                    wait = pow(2, retries) * backoff_const
+                    log.error('Retrying in %s seconds', wait)
+                    await asyncio.sleep(wait)
+                    await self.connect_controller(context)
+        return result
 
-    async def add_model(self, context):
-        if self.model:
+    async def add_model(self, context, name=None):
+        if self.model or name:
             if context.juju_model:
                 return
-            log.info("Connecting to model %s", self.model)
-            context.juju_model = juju.model.Model(loop=self.loop)
-            await context.juju_model.connect_model(self.model)
+            name = self.model or name
+            log.info("Connecting to model %s", name)
+            if self.simulate:
+                context.juju_model = simulate.FakeModel(name)
+            else:
+                context.juju_model = juju.model.Model(loop=self.loop)
+            await context.juju_model.connect_model(name)
+        elif self.pool is not None:
+            context.juju_model = await self.pool.get()
         else:
-            # work-around for: https://bugs.launchpad.net/juju/+bug/1652171
-            credential = await self._get_credential(context)
-            name = "{}-{}".format(
-                context.config.model_prefix,
-                petname.Generate(2, '-')
-            )
-            log.info("Creating model %s", name)
-            context.juju_model = await context.juju_controller.add_model(
-                name, credential_name=credential,
-                cloud_name=context.config.cloud)
+            context.juju_model = await self.create_model(context)
         self.bus.dispatch(
             origin="matrix",
             payload=context.juju_model,
             kind="model.new",
         )
 
+    async def create_model(self, context):
+        credential = None
+        if not self.simulate:
+            # work-around for: https://bugs.launchpad.net/juju/+bug/1652171
+            credential = await self._get_credential(context)
+        name = "{}-{}".format(
+            context.config.model_prefix,
+            petname.Generate(2, '-')
+        )
+        log.info("Creating model %s", name)
+        return await context.juju_controller.add_model(
+            name, credential_name=credential,
+            cloud_name=context.config.cloud)
+
     async def _get_credential(self, context):
         """
         Determine the credential to use for the current controller.
@@ -496,21 +885,46 @@ class RuleEngine:
             raise ValueError('Multiple credentials available for '
                              'cloud %s with no default set' % cloud)
 
-    async def destroy_model(self, context):
-        if self.model or not context.juju_model:
-            return
-        model_info = context.juju_model.info
+    async def _destroy_model(self, controller, juju_model):
+        model_info = juju_model.info
         log.info("Destroying model %s", model_info.name)
-        await context.juju_model.disconnect()
+        await juju_model.disconnect()
         await asyncio.wait_for(
-            context.juju_controller.destroy_models(model_info.uuid), 30)
-        context.juju_model = None
-        context.bus.dispatch(
-            origin="model",
-            payload=context.juju_model,
-            kind="model.new",
-        )
-        log.info("Model destroyed")
+            controller.destroy_models(model_info.uuid), 30)
+
+    def report_stats(self, event):
+        """
+        Log the subscribers that held up the bus the longest and write the
+        full bus statistics to bus_stats.json in the output dir.
+
+        """
+        stats = self.bus.stats()
+        log.info("Bus: %d events, peak queue depth %d, "
+                 "queue latency p99 %.3fs",
+                 sum(stats["dispatched"].values()),
+                 stats["queue"]["peak"],
+                 stats["queue_latency"]["p99"])
+        for name, hist in self.bus.slowest():
+            log.info("Bus subscriber %s: %d calls, %.3fs total, "
+                     "p99 %.3fs, max %.3fs",
+                     name, hist.count, hist.total,
+                     hist.quantile(0.99), hist.max)
+        filename = Path(self.output_dir or ".", "bus_stats.json")
+        try:
+            with filename.open("w") as fp:
+                json.dump(stats, fp, indent=2, sort_keys=True)
+        except OSError:
+            log.exception("Unable to write %s", filename)
+
+    @property
+    def durations_file(self):
+        return Path(self.output_dir or ".", "durations.json")
+
+    def record_durations(self, event):
+        # keep what earlier runs recorded for the tests we skipped
+        durations = load_durations(self.durations_file)
+        durations.update(self.durations)
+        save_durations(self.durations_file, durations)
 
     def handle_shutdown(self, event):
         self._should_run = False
@@ -547,6 +961,12 @@ class RuleEngine:
     async def __call__(self):
         btask = self.loop.create_task(self.bus.notify(False))
         context = self.load_suite()
+        if self.explain_plan:
+            self.print_plan(context)
+            self.bus.shutdown()
+            await btask
+            self.loop.stop()
+            return
         reporter = functools.partial(self.exception_handler, context)
         self.loop.set_exception_handler(reporter)
         if self.skin == "tui":
@@ -566,15 +986,44 @@ class RuleEngine:
         if self.xunit:
             xunit = XUnitView(self.bus, context, self.xunit)  # noqa
 
+        journal = None
+        if self.journal:
+            journal = Journal(Path(self.output_dir or ".", self.journal))
+            journal.subscribe(self.bus)
+
+        bridge = context.bridge = BusBridge(self.bus, context)
+        reporter = None
         try:
             view_controller.start()
+            await bridge.start()
+            if self.shards > 1:
+                self.exit_code = await Coordinator(self, context).run()
+                return
+            if os.environ.get(shard.ENV_VAR):
+                # we are a worker of a sharded run
+                reporter = await shard.ShardReporter(
+                    self.bus, os.environ[shard.ENV_VAR]).start()
             await self.connect_controller(context)
+            if self.model_pool > 0 and not self.model:
+                self.pool = ModelPool(
+                    self.loop, self.model_pool,
+                    functools.partial(self.create_model, context),
+                    functools.partial(self._destroy_model,
+                                      context.juju_controller))
+                self.pool.fill()
             await self.run(context)
         except Exception as e:
             log.exception("Error running Rules Engine. Cleaning up ...")
         finally:
+            if self.pool is not None:
+                await self.pool.close()
             # Wait for any unprocessed events before exiting the loop
             await btask
+            if reporter:
+                await reporter.stop()
+            await bridge.stop()
+            if journal:
+                journal.close()
             view_controller.stop()
             await context.juju_controller.disconnect()
             self.loop.stop()
@@ -0,0 +1,232 @@
+"""
+Split a run across several matrix processes.
+
+With --shards N the selected tests are divided between N worker
+processes, balanced by the test durations recorded by earlier runs. Each
+worker is an ordinary matrix run limited to its tests (with -t), using
+its own model prefix, optionally its own controller, and a directory of
+its own under the output dir. Workers stream their events back to the
+coordinator over a Unix socket, using the bridge's framing, where they
+are dispatched on the coordinator's bus. The coordinator's views (and its
+XUnit report) therefore cover the whole run.
+
+"""
+import asyncio
+import glob
+import heapq
+import logging
+import os
+import shlex
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+from .bridge import encode_frame, read_frame
+from .bus import eq
+from .graph import load_durations
+from . import utils
+
+log = logging.getLogger("matrix")
+
+ENV_VAR = "MATRIX_SHARD_SOCKET"
+# Events which only make sense within the process dispatching them
+LOCAL_EVENTS = {"test.schedule", "test.finish", "shutdown", "model.new"}
+
+
+def estimate(test, durations):
+    """Expected run time of ``test`` from recorded rule durations."""
+    recorded = durations.get(test.name)
+    if not recorded:
+        return None
+    if test.graph is not None:
+        return test.graph.critical_path(recorded)[0]
+    return sum(recorded.values())
+
+
+def partition(tests, durations, shards):
+    """
+    Divide ``tests`` into ``shards`` lists of about the same expected run
+    time, longest test first onto the least loaded shard. Tests without
+    recorded durations count as the average of those with them.
+
+    """
+    estimates = {t.name: estimate(t, durations) for t in tests}
+    known = [e for e in estimates.values() if e is not None]
+    default = sum(known) / len(known) if known else 1.0
+    for name, value in estimates.items():
+        if value is None:
+            estimates[name] = default
+
+    position = {t.name: i for i, t in enumerate(tests)}
+    ordered = sorted(tests,
+                     key=lambda t: (-estimates[t.name], position[t.name]))
+    loads = [(0.0, i) for i in range(shards)]
+    result = [[] for _ in range(shards)]
+    for test in ordered:
+        load, i = heapq.heappop(loads)
+        result[i].append(test)
+        heapq.heappush(loads, (load + estimates[test.name], i))
+    for tests_ in result:
+        tests_.sort(key=lambda t: position[t.name])
+    return result
+
+
+class Coordinator:
+    def __init__(self, engine, context):
+        self.engine = engine
+        self.context = context
+        self.bus = engine.bus
+        self.loop = engine.loop
+        self.procs = []
+        self.readers = []
+        self.completed = set()
+        self._tmpdir = None
+
+    def worker_command(self, index, tests):
+        engine = self.engine
+        if engine.shard_command:
+            cmd = shlex.split(engine.shard_command)
+        else:
+            cmd = [sys.executable, "-m", "matrix.main"]
+        output_dir = Path(engine.output_dir or ".", "shard-{}".format(index))
+        output_dir.mkdir(parents=True, exist_ok=True)
+        cmd += list(engine.argv or [])
+        # later options win, tests take the place of the patterns
+        cmd += ["--shards", "0",
+                "-s", "raw",
+                "-d", str(output_dir),
+                "-x", str(output_dir / "xunit.xml"),
+                "-M", "{}-s{}".format(engine.model_prefix, index)]
+        if engine.shard_controllers:
+            controllers = engine.shard_controllers
+            cmd += ["-c", controllers[index % len(controllers)]]
+        cmd += ["-t"] + [glob.escape(t.name) for t in tests]
+        return cmd, output_dir
+
+    async def run(self):
+        """Run the selected tests across the shards, return the exit code."""
+        engine = self.engine
+        context = self.context
+        engine.select_tests(context)
+        self.bus.subscribe(self.stop, eq("shutdown"))
+        self.bus.dispatch(
+            origin="matrix",
+            kind="test.schedule",
+            payload=context.suite)
+
+        self._tmpdir = tempfile.mkdtemp(prefix="matrix-")
+        path = Path(self._tmpdir, "shard.sock")
+        server = await asyncio.start_unix_server(self.handle, path=str(path))
+        env = dict(os.environ)
+        env[ENV_VAR] = str(path)
+
+        shards = partition(context.suite, engine.durations, engine.shards)
+        dirs = []
+        try:
+            for index, tests in enumerate(shards):
+                if not tests:
+                    continue
+                cmd, output_dir = self.worker_command(index, tests)
+                log.info("Shard %d: %s", index,
+                         ", ".join(t.name for t in tests))
+                log.debug("Starting %s", cmd)
+                with (output_dir / "worker.log").open("wb") as out:
+                    proc = await asyncio.create_subprocess_exec(
+                        *cmd, env=env,
+                        stdin=asyncio.subprocess.DEVNULL,
+                        stdout=out, stderr=out)
+                self.procs.append((index, proc))
+                dirs.append(output_dir)
+            codes = [await proc.wait() for _, proc in self.procs]
+            if self.readers:
+                # what the workers sent before exiting may still be queued
+                await asyncio.wait(self.readers, timeout=30)
+        finally:
+            server.close()
+            await server.wait_closed()
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+        for (index, _), code in zip(self.procs, codes):
+            if code:
+                log.error("Shard %d exited with %d", index, code)
+        for test in context.suite:
+            if test.name not in self.completed:
+                log.error("%s did not complete", test.name)
+                self.bus.dispatch(
+                    kind="test.complete",
+                    origin="matrix",
+                    test=test.name,
+                    payload=dict(test=test, result=False))
+        # so the next run can balance on what the workers measured
+        for output_dir in dirs:
+            engine.durations.update(
+                load_durations(output_dir / "durations.json"))
+        self.bus.dispatch(
+            origin="matrix",
+            kind="test.finish",
+            payload=context)
+        return max([abs(c) for c in codes] + [0]) or None
+
+    async def handle(self, reader, writer):
+        self.readers.append(utils.current_task(self.loop))
+        try:
+            while True:
+                msg = await read_frame(reader, object_hook=utils.O)
+                if msg is None:
+                    break
+                if msg.get("op") != "dispatch":
+                    continue
+                if msg["kind"] == "test.complete":
+                    self.completed.add(msg["payload"]["test"]["name"])
+                self.bus.dispatch(
+                    kind=msg["kind"],
+                    origin=msg.get("origin", "shard"),
+                    test=msg.get("test"),
+                    payload=msg.get("payload"),
+                    created=msg.get("created"))
+        except Exception:
+            log.exception("Error reading from shard")
+        finally:
+            writer.close()
+
+    def stop(self, event):
+        for index, proc in self.procs:
+            if proc.returncode is None:
+                log.debug("Stopping shard %d", index)
+                proc.terminate()
+
+
+class ShardReporter:
+    """Forward a worker's events to the coordinator at $MATRIX_SHARD_SOCKET."""
+    def __init__(self, bus, path):
+        self.bus = bus
+        self.path = path
+        self.writer = None
+
+    async def start(self):
+        _, self.writer = await asyncio.open_unix_connection(str(self.path))
+        self.bus.subscribe(self.forward,
+                           lambda e: e.kind not in LOCAL_EVENTS,
+                           batch=True)
+        return self
+
+    def forward(self, events):
+        for event in events:
+            try:
+                frame = encode_frame({"op": "dispatch",
+                                      "kind": event.kind,
+                                      "origin": event.origin,
+                                      "test": event.test,
+                                      "created": event.created,
+                                      "payload": event.payload})
+            except Exception:
+                log.debug("Unable to forward %s", event.kind, exc_info=True)
+                continue
+            self.writer.write(frame)
+
+    async def stop(self):
+        if self.writer is not None:
+            await self.writer.drain()
+            self.writer.close()
+            self.writer = None
@@ -0,0 +1,212 @@
+"""
+Dry runs of a suite in virtual time.
+
+``matrix --simulate [FILE]`` runs the rule engine as usual but on a
+VirtualTimeLoop, against a fake controller and models, with every task
+replaced by a stand-in which sleeps for a configured duration, sets
+configured states and then passes or fails. Whenever nothing is ready to
+run the loop jumps straight to its next timer, so hours of periodic checks
+and deploys take well under a second, and the run ends with the expected
+timeline and exit code.
+
+FILE is YAML mapping task commands (or "default") to how they behave:
+
+    default:
+      duration: 60
+    tasks:
+      matrix.tasks.deploy:
+        duration: 1200
+      matrix.tasks.health:
+        duration: 10
+        states:
+          health.status: healthy
+      matrix.tasks.chaos:
+        duration: 300
+        result: fail        # pass (default), fail or error
+
+"""
+import asyncio
+import itertools
+import logging
+import selectors
+import sys
+
+from .bus import eq, prefixed
+from .model import TestFailure
+from . import utils
+
+log = logging.getLogger("matrix")
+
+DEFAULT_TASK = {"duration": 60, "result": "pass"}
+# Close enough to the real thing for the default suite to schedule the
+# way it would against a controller
+DEFAULT_TASKS = {
+    "matrix.tasks.deploy": {"duration": 900},
+    "matrix.tasks.health": {"duration": 10,
+                            "states": {"health.status": "healthy"}},
+    "matrix.tasks.chaos": {"duration": 300},
+    "matrix.tasks.end_to_end": {"duration": 600},
+}
+
+
+class _VirtualSelector:
+    """
+    Selector wrapper which, rather than blocking until the next timer is
+    due, moves the loop's clock forward to it.
+
+    """
+    def __init__(self, selector):
+        self.selector = selector
+        self.loop = None
+
+    def select(self, timeout=None):
+        ready = self.selector.select(0)
+        if ready or timeout is not None and timeout <= 0:
+            return ready
+        if timeout is None:
+            # only I/O can wake us up
+            return self.selector.select(None)
+        self.loop.advance(timeout)
+        return ready
+
+    def __getattr__(self, name):
+        return getattr(self.selector, name)
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    def __init__(self, start=0.0):
+        selector = _VirtualSelector(selectors.DefaultSelector())
+        super().__init__(selector)
+        selector.loop = self
+        self._virtual_time = start
+
+    def time(self):
+        return self._virtual_time
+
+    def advance(self, seconds):
+        self._virtual_time += seconds
+
+
+class FakeModel:
+    _uuids = itertools.count(1)
+
+    def __init__(self, name):
+        self.info = utils.O(name=name,
+                            uuid="simulated-{}".format(next(self._uuids)))
+        self.applications = {}
+
+    async def connect_model(self, name):
+        self.info = utils.O(self.info, name=name)
+
+    async def disconnect(self):
+        pass
+
+
+class FakeController:
+    def __init__(self, loop=None):
+        self.loop = loop
+        self.models = {}
+
+    async def connect_current(self):
+        pass
+
+    async def connect_controller(self, name):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    async def get_cloud(self):
+        return "simulated"
+
+    async def add_model(self, name, credential_name=None, cloud_name=None):
+        log.info("Simulating model %s", name)
+        model = self.models[name] = FakeModel(name)
+        return model
+
+    async def destroy_models(self, *uuids):
+        for name, model in list(self.models.items()):
+            if model.info.uuid in uuids:
+                del self.models[name]
+
+
+def load_behaviour(path=None):
+    """Return (default, {command: behaviour}) from a simulation file."""
+    default = dict(DEFAULT_TASK)
+    tasks = {k: dict(DEFAULT_TASK, **v) for k, v in DEFAULT_TASKS.items()}
+    if path:
+        spec = utils.load_yaml(path) or {}
+        default.update(spec.get("default") or {})
+        for command, behaviour in (spec.get("tasks") or {}).items():
+            tasks[command] = dict(default, **(behaviour or {}))
+    return default, tasks
+
+
+def fake_task(behaviour):
+    async def simulated(context, rule, task, event=None):
+        await asyncio.sleep(float(behaviour.get("duration", 0)))
+        for name, value in (behaviour.get("states") or {}).items():
+            context.set_state(name, value)
+        result = behaviour.get("result", "pass")
+        if result == "fail":
+            raise TestFailure(task, "Simulated failure")
+        if result == "error":
+            raise RuntimeError("Simulated error in {}".format(task.command))
+        return True
+    simulated.behaviour = behaviour
+    return simulated
+
+
+def install(context, path=None):
+    """Stand a fake task in for every task of the suite."""
+    default, tasks = load_behaviour(path)
+    for test in context.suite:
+        for rule in test.rules:
+            command = rule.task.command
+            if command not in context.tasks:
+                context.tasks[command] = fake_task(
+                    tasks.get(command, default))
+
+
+class SimulationReport:
+    """Print the virtual time at which each test and rule started and
+    finished once the run is over."""
+    KINDS = ("test.start", "test.complete", "rule.create", "rule.done",
+             "rule.timeout", "test.timeout")
+
+    def __init__(self, bus, engine, out=None):
+        self.bus = bus
+        self.engine = engine
+        self.out = out or sys.stdout
+        self.start = bus.loop.time()
+        self.entries = []
+        bus.subscribe(self.record, prefixed("test."))
+        bus.subscribe(self.record, prefixed("rule."))
+        bus.subscribe(self.report, eq("test.finish"))
+
+    def record(self, e):
+        if e.kind not in self.KINDS:
+            return
+        payload = e.payload
+        if e.kind.startswith("rule."):
+            name = payload["rule"].name
+        elif e.kind == "test.start":
+            name = payload.name
+        else:
+            name = payload["test"].name
+        result = ""
+        if isinstance(payload, dict) and "result" in payload:
+            result = payload["result"]
+        self.entries.append((e.time - self.start, e.test or "", e.kind,
+                             name, result))
+
+    def report(self, e):
+        out = self.out
+        print("Simulated timeline", file=out)
+        for offset, test, kind, name, result in self.entries:
+            print("{:>10.1f}s  {:24} {:14} {} {}".format(
+                offset, test[:24], kind, name,
+                "" if result in ("", None) else result).rstrip(), file=out)
+        print("Simulated run took {:.1f}s, exit code {}".format(
+            e.time - self.start, self.engine.exit_code or 0), file=out)
+        out.flush()
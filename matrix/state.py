@@ -0,0 +1,152 @@
+import asyncio
+
+_marker = object()
+
+
+def _any(value):
+    return True
+
+
+class StateStore(dict):
+    """
+    The states of a context.
+
+    A dict which numbers every change: ``version`` is bumped on each set
+    or delete and ``versions`` records the version of the last change to
+    each key, so ``diff`` can tell what changed since a given version
+    without comparing values. Setting a key (even to the value it already
+    has) notifies the watches on it, ``wait_for`` and ``changed`` build
+    awaitables on top of those.
+
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.version = 0
+        self.versions = {}
+        # key -> version of its removal
+        self.removed = {}
+        # key -> [(predicate, callback)]
+        self.watches = {}
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key, value):
+        old = self.get(key, _marker)
+        super().__setitem__(key, value)
+        if old is _marker or old != value:
+            self.version += 1
+            self.versions[key] = self.version
+            self.removed.pop(key, None)
+        self._notify(key, value)
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version += 1
+        self.versions.pop(key, None)
+        self.removed[key] = self.version
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, default=_marker):
+        if key in self:
+            value = self[key]
+            del self[key]
+            return value
+        if default is _marker:
+            raise KeyError(key)
+        return default
+
+    def clear(self):
+        """Remove every state. Watches are kept and not notified."""
+        for key in list(self):
+            del self[key]
+
+    def snapshot(self):
+        """Return (version, copy of the states)."""
+        return self.version, dict(self)
+
+    def diff(self, since):
+        """
+        Return (changed, removed) since ``since``: a dict of the keys set
+        to a new value and a list of the keys deleted.
+
+        """
+        changed = {k: self[k] for k, v in self.versions.items() if v > since}
+        removed = [k for k, v in self.removed.items() if v > since]
+        return changed, removed
+
+    def watch(self, key, callback, predicate=None):
+        """
+        Call ``callback(key, value)`` whenever ``key`` is set to a value
+        ``predicate`` accepts (any value by default). Returns a handle for
+        ``unwatch``.
+
+        """
+        handle = (predicate or _any, callback)
+        self.watches.setdefault(key, []).append(handle)
+        return key, handle
+
+    def unwatch(self, handle):
+        key, handle = handle
+        watches = self.watches.get(key)
+        if watches and handle in watches:
+            watches.remove(handle)
+            if not watches:
+                del self.watches[key]
+
+    def _notify(self, key, value):
+        for predicate, callback in list(self.watches.get(key, ())):
+            if predicate(value):
+                callback(key, value)
+
+    def changed(self, keys, loop=None):
+        """
+        Return a future resolving with the first of ``keys`` to be set.
+
+        """
+        loop = loop or asyncio.get_event_loop()
+        f = loop.create_future()
+        handles = []
+
+        def resolve(key, value):
+            if not f.done():
+                f.set_result(key)
+
+        def forget(f):
+            for handle in handles:
+                self.unwatch(handle)
+
+        for key in set(keys):
+            handles.append(self.watch(key, resolve))
+        f.add_done_callback(forget)
+        return f
+
+    async def wait_for(self, key, predicate=None, timeout=None, loop=None):
+        """
+        Wait until ``key`` holds a value ``predicate`` accepts (any value
+        by default) and return it, raising asyncio.TimeoutError after
+        ``timeout`` seconds.
+
+        """
+        predicate = predicate or _any
+        value = self.get(key, _marker)
+        if value is not _marker and predicate(value):
+            return value
+        loop = loop or asyncio.get_event_loop()
+        f = loop.create_future()
+
+        def resolve(key, value):
+            if not f.done():
+                f.set_result(value)
+
+        handle = self.watch(key, resolve, predicate)
+        try:
+            return await asyncio.wait_for(f, timeout)
+        finally:
+            self.unwatch(handle)
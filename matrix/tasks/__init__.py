@@ -3,5 +3,5 @@ from .health import health  # noqa
 from .fail import fail  # noqa
 from .chaos import chaos  # noqa
 from .run_action import run_action  # noqa
-from .reset import reset  # noqa
+from .reset import reset, restore  # noqa
 from .end_to_end import end_to_end  # noqa
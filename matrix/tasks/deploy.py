@@ -1,11 +1,10 @@
-import yaml
 from distutils.spawn import find_executable
 from pathlib import Path
 
 from juju import client
 
 from matrix.model import InfraFailure
-from matrix.utils import execute_process
+from matrix.utils import execute_process, load_yaml
 
 
 async def libjuju(context, rule):
@@ -45,8 +44,7 @@ def is_spell(bundle):
     if not metadata_yaml.exists():
         return False
 
-    with metadata_yaml.open('r') as metadata:
-        return yaml.safe_load(metadata).get('friendly-name')
+    return load_yaml(metadata_yaml).get('friendly-name')
 
 
 async def conjureup(context, rule):
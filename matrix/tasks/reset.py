@@ -1,3 +1,4 @@
+from matrix.bundle import restore_shape
 
 
 async def reset(context, rule, task, event=None):
@@ -5,3 +6,12 @@ async def reset(context, rule, task, event=None):
     await context.juju_model.reset()
     rule.log.info("Reset COMPLETE")
     return True
+
+
+async def restore(context, rule, task, event=None):
+    rule.log.info("Restoring the model to the bundle's shape")
+    if not await restore_shape(context.juju_model, context.config.path,
+                               rule.log):
+        return False
+    rule.log.info("Restore COMPLETE")
+    return True
@@ -0,0 +1,71 @@
+import heapq
+import itertools
+
+
+class Timer:
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Timers:
+    """
+    Deadlines kept in a single heap, served by one loop callback scheduled
+    for the earliest of them.
+
+    Cancelled timers stay in the heap until they come up, which keeps
+    cancel O(1); most deadlines are cancelled long before they are due.
+
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self._heap = []
+        self._seq = itertools.count()
+        self._handle = None
+        self._next = None
+
+    def __len__(self):
+        return sum(1 for _, _, t in self._heap if not t.cancelled)
+
+    def call_later(self, delay, callback, *args):
+        timer = Timer(self.loop.time() + delay, callback, args)
+        heapq.heappush(self._heap, (timer.when, next(self._seq), timer))
+        self._schedule()
+        return timer
+
+    def _schedule(self):
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return
+        when = self._heap[0][0]
+        if self._next is not None and self._next <= when:
+            return
+        if self._handle is not None:
+            self._handle.cancel()
+        self._next = when
+        self._handle = self.loop.call_at(when, self._fire)
+
+    def _fire(self):
+        self._handle = self._next = None
+        now = self.loop.time()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, timer = heapq.heappop(self._heap)
+            if not timer.cancelled:
+                timer.callback(*timer.args)
+        self._schedule()
+
+    def close(self):
+        for _, _, timer in self._heap:
+            timer.cancel()
+        self._heap = []
+        if self._handle is not None:
+            self._handle.cancel()
+        self._handle = self._next = None
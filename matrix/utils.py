@@ -1,16 +1,26 @@
 import argparse
 import asyncio
 import copy
+import hashlib
 import logging
 import importlib
+import os
+import pickle
 import re
 import textwrap
 from contextlib import contextmanager
+from pathlib import Path
 
 import urwid
+import yaml
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 
 _marker = object()
+log = logging.getLogger("matrix")
 
 
 def resolve_dotpath(name):
@@ -81,6 +91,68 @@ def merge_spec(old_spec, new_spec):
             old_spec['tests'].append(new_test)
 
 
+# Bump when what is stored in the parse cache changes shape
+CACHE_VERSION = 1
+
+
+def cache_dir():
+    """Directory for the parse cache, $MATRIX_CACHE_DIR or XDG's."""
+    path = os.getenv("MATRIX_CACHE_DIR")
+    if path:
+        return Path(path)
+    return Path(os.getenv("XDG_CACHE_HOME") or "~/.cache",
+                "matrix").expanduser()
+
+
+def content_key(kind, *paths):
+    """Hash ``kind`` and the contents of ``paths``, in order."""
+    digest = hashlib.sha256("{}:{}:{}".format(
+        CACHE_VERSION, yaml.__version__, kind).encode("utf-8"))
+    for path in paths:
+        digest.update(hashlib.sha256(Path(path).read_bytes()).digest())
+    return digest.hexdigest()
+
+
+def cached(key, build):
+    """
+    Return the value stored in the parse cache under ``key``, calling
+    ``build`` and storing its result on a miss. Every call returns a
+    fresh copy so callers are free to modify it.
+
+    """
+    path = cache_dir() / key
+    try:
+        with path.open("rb") as fp:
+            return pickle.load(fp)
+    except FileNotFoundError:
+        pass
+    except Exception:
+        log.debug("Ignoring bad cache entry %s", path, exc_info=True)
+    value = build()
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".{}.tmp".format(os.getpid()))
+        with tmp.open("wb") as fp:
+            pickle.dump(value, fp, pickle.HIGHEST_PROTOCOL)
+        tmp.rename(path)
+    except OSError:
+        log.debug("Unable to cache %s", path, exc_info=True)
+    return value
+
+
+def parse_yaml(stream):
+    """Parse YAML data, with libyaml when it is available."""
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def load_yaml(path):
+    """Parse the YAML file at ``path`` through the parse cache."""
+    def build():
+        with Path(path).open() as fp:
+            return parse_yaml(fp)
+    return cached(content_key("yaml", path), build)
+
+
 class O(dict):
     def __getattr__(self, key):
         value = self.get(key, _marker)
@@ -238,10 +310,12 @@ async def crashdump(log, model_name, controller=None, directory=None):
             log.info("Crashdump COMPLETE")
         else:
             log.error("Crashdump FAILED")
+        return success
     except FileNotFoundError:
         log.warning(
             "Tried to run crashdump, but could not find the executable. "
             "Is it installed in your environment?")
+        return False
 
 
 def should_gate(context, task):
@@ -257,6 +331,17 @@ def should_gate(context, task):
     return False
 
 
+def current_task(loop=None):
+    """Return the running asyncio task, or None outside of one."""
+    try:
+        if hasattr(asyncio, "current_task"):
+            return asyncio.current_task(loop)
+        return asyncio.Task.current_task(loop)
+    except RuntimeError:
+        # no running loop
+        return None
+
+
 @contextmanager
 def new_event_loop():
     old_loop = asyncio.get_event_loop()
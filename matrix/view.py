@@ -194,7 +194,7 @@ def render_task_row(row):
     rule = row['rule']
     state = row.get("state", PENDING)
     output = [
-        "{:18} -> ".format(rule.name),
+        "{:18} -> ".format(row.get("label", rule.name)),
         state.ljust(15),
         " "
             ]
@@ -253,6 +253,8 @@ class TUIView(View, urwid.WidgetWrap):
         self.juju_model = None
         self.screen = screen
         self._input_mode = "default"
+        # tests may run concurrently, see RuleEngine.run
+        self.parallel = getattr(context.config, "max_jobs", 1) > 1
         super().__init__(bus, context)
         urwid.WidgetWrap.__init__(self, self.build_ui())
 
@@ -296,7 +298,8 @@ class TUIView(View, urwid.WidgetWrap):
         self.status = Lines(
             collections.deque([], 100),
             widget_func=render_status)
-        self.bus.subscribe(self.show_log, eq("logging.message"))
+        self.bus.subscribe(self.show_log, eq("logging.message"),
+                           batch=True)
 
         self.running = True
         self.model = Lines(ansi_colors=True)
@@ -450,7 +453,8 @@ class TUIView(View, urwid.WidgetWrap):
             self.tests[name]["result"] = e.payload['result']
             self.tests[name]["stop"] = e.time
             self.add_log("-" * 78)
-            self.tasks.clear()
+            for key in [k for k in self.tasks if k[0] == e.test]:
+                del self.tasks[key]
         elif e.kind == "test.finish":
             pass
 
@@ -468,20 +472,24 @@ class TUIView(View, urwid.WidgetWrap):
     def add_log(self, msg):
         self.status.update(msg)
 
-    def show_log(self, event):
-        self.add_log(event.payload)
+    def show_log(self, events):
+        self.status.extend([e.payload for e in events])
+        self.status.walker.set_focus(len(self.status.m) - 1)
 
     def show_rule_state(self, event):
         t = event.payload
         rule = t['rule']
-        d = self.tasks.setdefault(rule.name, {})
+        d = self.tasks.setdefault((event.test, rule.name), {})
         d.update(t)
+        if self.parallel:
+            d["label"] = "{}: {}".format(event.test, rule.name)
         self.task_walker.set_focus(len(self.tasks) - 1)
 
     def show_state_change(self, event):
         sc = event.payload
-        if sc["name"] in self.tasks:
-            self.tasks[sc["name"]]["state"] = sc["new_value"]
+        key = (event.test, sc["name"])
+        if key in self.tasks:
+            self.tasks[key]["state"] = sc["new_value"]
             self.task_walker._modified()
 
     def new_model(self, event):
@@ -491,11 +499,12 @@ class TUIView(View, urwid.WidgetWrap):
 class RawView(View):
     def subscribe(self):
         self.results = {}
-        self.bus.subscribe(self.show_log, eq("logging.message"))
+        self.bus.subscribe(self.show_log, eq("logging.message"),
+                           batch=True)
         self.bus.subscribe(self.show_test, prefixed("test."))
 
-    def show_log(self, e):
-        print(e.payload.output)
+    def show_log(self, events):
+        print("\n".join(e.payload.output for e in events))
         sys.stdout.flush()
 
     def show_test(self, e):
@@ -513,20 +522,41 @@ class RawView(View):
                 result = TEST_SYMBOLS[self.results[test.name]][1]
                 msg = "{:18} {}".format(test.name, result)
                 print(msg)
+            self.show_teardowns(getattr(context, "teardowns", None))
             self.bus.shutdown()
         sys.stdout.flush()
 
+    def show_teardowns(self, teardowns):
+        if not teardowns:
+            return
+        print("Model Teardown")
+        for teardown in teardowns:
+            steps = []
+            if teardown.get("error"):
+                steps.append("error: {}".format(teardown["error"]))
+            for key, step in (("crashdump", "crashdump"),
+                              ("destroyed", "destroy")):
+                done = teardown.get(key)
+                if done is not None:
+                    steps.append("{} {}".format(
+                        step, "ok" if done else "FAILED"))
+            print("{:18} {} ({:.1f}s)".format(
+                teardown["model"], ", ".join(steps), teardown["duration"]))
+
 
 class XUnitView(View):
     def __init__(self, bus, context, filename):
         self.filename = filename
         self.results = []
-        self.current_test = None
+        # test name -> result, several tests can run at once
+        self.records = {}
+        self.running = collections.OrderedDict()
         super().__init__(bus, context)
 
     def subscribe(self):
         self.bus.subscribe(self.start_test, eq("test.start"))
-        self.bus.subscribe(self.record_output, eq("logging.message"))
+        self.bus.subscribe(self.record_output, eq("logging.message"),
+                           batch=True)
         self.bus.subscribe(self.record_result, eq("test.complete"))
         self.bus.subscribe(self.write_report, eq("test.finish"))
 
@@ -534,9 +564,9 @@ class XUnitView(View):
         test = e.payload
         deploy_entity = None
         for rule in test.rules:
-            if rule.action.command.endswith('.deploy'):
-                deploy_entity = rule.action.args['entity']
-        self.current_test = {
+            if rule.task.command.endswith('.deploy'):
+                deploy_entity = rule.task.args.get('entity')
+        self.records[test.name] = self.running[test.name] = {
             "name": "{}: {}".format(deploy_entity, test.name),
             "result": None,
             "output": [],
@@ -544,16 +574,29 @@ class XUnitView(View):
             "start_time": time(),
         }
 
-    def record_output(self, e):
-        if self.current_test:
-            self.current_test["output"].append(e.payload.output)
-            if e.payload.levelname == "ERROR":
-                self.current_test["errors"].append(e.payload.output)
+    def record_output(self, events):
+        for e in events:
+            if e.test in self.records:
+                targets = [self.records[e.test]]
+            elif self.running:
+                # untagged output goes to whatever is running
+                targets = self.running.values()
+            elif self.results:
+                targets = self.results[-1:]
+            else:
+                continue
+            for current in targets:
+                current["output"].append(e.payload.output)
+                if e.payload.levelname == "ERROR":
+                    current["errors"].append(e.payload.output)
 
     def record_result(self, e):
-        self.current_test["result"] = e.payload["result"]
-        self.current_test["end_time"] = time()
-        self.results.append(self.current_test)
+        current = self.running.pop(e.payload["test"].name, None)
+        if current is None:
+            return
+        current["result"] = e.payload["result"]
+        current["end_time"] = time()
+        self.results.append(current)
 
     def write_report(self, e):
         top = Element("testsuites")
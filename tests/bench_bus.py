@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the event bus.
+
+Reports events/sec for Bus.dispatch alone and for dispatch plus delivery
+through notify to a small set of subscribers resembling a normal run (TUI,
+XUnit and timeline subscribers).
+
+    python3 tests/bench_bus.py [-n EVENTS]
+
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+from matrix.bus import Bus, eq, prefixed
+
+
+def make_bus(loop):
+    bus = Bus(loop=loop)
+    sink = []
+    bus.subscribe(sink.append, eq("logging.message"))
+    bus.subscribe(sink.append, prefixed("test."))
+    bus.subscribe(sink.append, prefixed("rule."))
+    bus.subscribe(sink.append, eq("state.change"))
+    bus.subscribe(sink.append, eq("model.new"))
+    return bus
+
+
+def bench_dispatch(loop, n):
+    bus = make_bus(loop)
+    record = logging.makeLogRecord({"msg": "benchmark"})
+    start = time.perf_counter()
+    for _ in range(n):
+        bus.dispatch(kind="logging.message", origin="bench", payload=record)
+    return n / (time.perf_counter() - start)
+
+
+def bench_deliver(loop, n):
+    bus = make_bus(loop)
+    record = logging.makeLogRecord({"msg": "benchmark"})
+    start = time.perf_counter()
+    for _ in range(n):
+        bus.dispatch(kind="logging.message", origin="bench", payload=record)
+    loop.run_until_complete(bus.notify(True))
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--events", type=int, default=100000)
+    options = parser.parse_args()
+    loop = asyncio.new_event_loop()
+    print("dispatch:           {:>10.0f} events/sec".format(
+        bench_dispatch(loop, options.events)))
+    print("dispatch + deliver: {:>10.0f} events/sec".format(
+        bench_deliver(loop, options.events)))
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Stand-in for the matrix process of a shard, see test_shard.py.
+
+Reports each test given with -t as run, tests with "chaos" in their name
+fail and tests with "action" in their name are never completed.
+
+"""
+import argparse
+import os
+import socket
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from matrix.bridge import encode_frame  # noqa
+from matrix.shard import ENV_VAR  # noqa
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-t", nargs="*")
+    parser.add_argument("-M")
+    options, _ = parser.parse_known_args()
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(os.environ[ENV_VAR])
+
+    def send(kind, test, payload):
+        sock.sendall(encode_frame({"op": "dispatch", "kind": kind,
+                                   "origin": "fake", "test": test["name"],
+                                   "payload": payload}))
+
+    exit_code = 0
+    for name in options.t:
+        test = {"name": name, "description": "", "rules": []}
+        send("test.start", test, test)
+        send("logging.message", test,
+             {"name": "fake", "levelname": "INFO", "levelno": 20,
+              "output": "{} on {}".format(name, options.M)})
+        if "action" in name:
+            continue
+        result = "chaos" not in name
+        if not result:
+            exit_code = 101
+        send("test.complete", test, {"test": test, "result": result})
+    sock.close()
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+from matrix.bridge import BusBridge, ENV_VAR
+from matrix.bus import Bus, eq
+from matrix.model import Context
+
+CHILD = """
+from matrix.bridge import Client
+with Client(origin="child") as bus:
+    for i in range(100):
+        bus.dispatch("load.sample", {"n": i})
+    bus.set_state("load", "running")
+    print(bus.states()["load"])
+    bus.set_state("load", "done")
+    print(bus.changes())
+"""
+
+
+def test_bridge(tmpdir):
+    loop = asyncio.new_event_loop()
+    bus = Bus(loop=loop)
+    context = Context(loop=loop, bus=bus, config=None,
+                      juju_controller=None, suite=[])
+    samples = []
+    bus.subscribe(samples.append, eq("load.sample"))
+    bridge = BusBridge(bus, context, path=str(tmpdir.join("bus.sock")))
+
+    async def run():
+        await bridge.start()
+        env = dict(os.environ, PYTHONPATH=str(Path(__file__).parent.parent))
+        env.update(bridge.environ())
+        assert env[ENV_VAR] == str(bridge.path)
+        p = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", CHILD, env=env,
+            stdout=asyncio.subprocess.PIPE)
+        stdout, _ = await p.communicate()
+        await bridge.stop()
+        return stdout
+
+    context.states["other"] = "set before the child ran"
+    assert loop.run_until_complete(run()).split(b"\n")[:2] == [
+        b"running", b"({'load': 'done'}, [])"]
+    loop.run_until_complete(bus.notify(True))
+    assert context.states["load"] == "done"
+    assert [e.payload["n"] for e in samples] == list(range(100))
+    assert samples[0].origin == "child"
+    assert not bridge.path.exists()
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+from unittest import mock
+
+from matrix.bundle import bundle_shape, restore_shape
+
+
+def fake_app(units):
+    app = mock.Mock()
+    app.units = [mock.Mock() for _ in range(units)]
+    for unit in app.units:
+        unit.destroy = mock.Mock(return_value=done())
+    app.add_unit = mock.Mock(return_value=done())
+    app.remove = mock.Mock(return_value=done())
+    return app
+
+
+async def done():
+    pass
+
+
+def test_restore_shape(tmpdir):
+    loop = asyncio.new_event_loop()
+    log = logging.getLogger("test")
+    tmpdir.join("bundle.yaml").write("""
+applications:
+  db:
+    num_units: 3
+  web:
+    num_units: 1
+  filebeat: {}
+""")
+    assert bundle_shape(str(tmpdir)) == {"db": 3, "web": 1, "filebeat": None}
+    model = mock.Mock()
+    model.applications = {"db": fake_app(1), "web": fake_app(2),
+                          "filebeat": fake_app(0), "extra": fake_app(1)}
+    apps = dict(model.applications)
+    assert loop.run_until_complete(restore_shape(model, str(tmpdir), log))
+    apps["db"].add_unit.assert_called_once_with(count=2)
+    assert not apps["web"].units[0].destroy.called
+    assert apps["web"].units[1].destroy.called
+    assert apps["extra"].remove.called
+    assert not apps["filebeat"].add_unit.called
+
+    del model.applications["db"]
+    assert not loop.run_until_complete(
+        restore_shape(model, str(tmpdir), log))
+    assert not loop.run_until_complete(
+        restore_shape(model, str(tmpdir.join("nowhere")), log))
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+
+import pytest
+
+from matrix.bus import Bus, PrefixTrie, eq, glob, prefixed
+
+
+def test_route_index():
+    bus = Bus(loop=asyncio.new_event_loop())
+    seen = []
+
+    def recorder(tag):
+        def record(e):
+            seen.append((tag, e.kind))
+        return record
+
+    bus.subscribe(recorder("exact"), eq("test.start"))
+    bus.subscribe(recorder("prefix"), prefixed("test."))
+    bus.subscribe(recorder("glob"), glob("rule.d*e"))
+    bus.subscribe(recorder("fallback"), lambda e: e.kind.endswith("done"))
+    uid = bus.subscribe(recorder("gone"), eq("test.start"))
+    bus.unsubscribe(uid)
+
+    assert len(bus.route("test.start")) == 3
+    assert len(bus.route("logging.message")) == 1
+
+    for kind in ["test.start", "rule.done", "rule.dead", "logging.message"]:
+        bus.dispatch(kind=kind)
+    bus.loop.run_until_complete(bus.notify(True))
+    assert seen == [
+        ("exact", "test.start"),
+        ("prefix", "test.start"),
+        ("glob", "rule.done"),
+        ("fallback", "rule.done"),
+    ]
+
+
+def test_prefix_trie():
+    trie = PrefixTrie()
+    trie.add("", "all")
+    trie.add("test.", "test")
+    trie.add("test.start", "start")
+    assert trie.match("test.start") == ["all", "test", "start"]
+    assert trie.match("rule.done") == ["all"]
+    trie.remove("test.start", "start")
+    trie.remove("test.", "test")
+    assert trie.root == {None: ["all"]}
+
+
+@pytest.mark.parametrize("pattern,index", [
+    ("shutdown", ("exact", "shutdown")),
+    ("logging.*", ("prefix", "logging.")),
+    ("*", ("prefix", "")),
+    ("test.[sc]*", ("prefix", "test.")),
+])
+def test_glob_index(pattern, index):
+    assert glob(pattern).index == index
+
+
+def test_isolated_subscriber():
+    loop = asyncio.new_event_loop()
+    bus = Bus(loop=loop)
+    release = asyncio.Event()
+    slow, fast = [], []
+
+    async def slow_handler(e):
+        await release.wait()
+        slow.append(e.kind)
+
+    uid = bus.subscribe(slow_handler, eq("tick"), isolated=True)
+    bus.subscribe(lambda e: fast.append(e.kind), eq("tick"))
+
+    async def run():
+        for _ in range(3):
+            bus.dispatch(kind="tick")
+        notify = loop.create_task(bus.notify(True))
+        await asyncio.sleep(0.01)
+        # the inline subscriber has seen everything while the isolated one
+        # is still blocked on its first event
+        assert fast == ["tick"] * 3
+        name, queued, in_flight = bus.queue_depths()[uid]
+        assert (queued, in_flight) == (2, 1)
+        release.set()
+        await notify
+
+    loop.run_until_complete(run())
+    assert slow == ["tick"] * 3
+    bus.unsubscribe(uid)
+    assert bus.queue_depths() == {}
+    # let the worker see its stop marker
+    loop.run_until_complete(asyncio.sleep(0))
+    loop.close()
+
+
+def test_bounded_queue():
+    loop = asyncio.new_event_loop()
+    bus = Bus(loop=loop, maxsize=2)
+    seen = []
+    bus.subscribe(seen.append)
+
+    for i in range(4):
+        record = logging.makeLogRecord(
+            {"levelno": logging.ERROR if i == 3 else logging.INFO,
+             "levelname": "ERROR" if i == 3 else "INFO"})
+        record.output = str(i)
+        bus.dispatch(kind="logging.message", origin="a", payload=record)
+    bus.dispatch(kind="logging.message", origin="b",
+                 payload=logging.makeLogRecord({}))
+    bus.dispatch(kind="state.change", origin="context")
+    loop.run_until_complete(bus.notify(True))
+
+    assert [e.kind for e in seen] == [
+        "state.change", "logging.message", "logging.message"]
+    merged = seen[2].payload
+    assert merged.output == "1\n2\n3"
+    assert merged.levelname == "ERROR"
+    assert merged.coalesced == 3
+    assert bus.overflow() == {"dropped": {"logging.message": 1},
+                              "coalesced": {"logging.message": 2}}
+
+
+def test_event_callsite():
+    loop = asyncio.new_event_loop()
+    bus = Bus(loop=loop)
+    seen = []
+    bus.subscribe(seen.append)
+    bus.dispatch(kind="a", extra=1)
+    bus.dispatch(kind="b", created="elsewhere")
+    bus.callsite = False
+    bus.dispatch(kind="c")
+    loop.run_until_complete(bus.notify(True))
+
+    a, b, c = seen
+    assert a.payload == {"extra": 1}
+    assert a.created.endswith(":test_event_callsite")
+    assert "tests/test_bus.py" in a.created
+    assert b.created == "elsewhere"
+    assert c.created is None
+    assert not hasattr(a, "__dict__")
+
+
+def test_priority_lanes():
+    loop = asyncio.new_event_loop()
+    bus = Bus(loop=loop)
+    seen = []
+    bus.subscribe(lambda e: seen.append(e.kind))
+
+    for i in range(1000):
+        bus.dispatch(kind="logging.message", payload=i)
+    bus.dispatch(kind="model.new")
+    bus.dispatch(kind="state.change")
+    bus.shutdown()
+    loop.run_until_complete(bus.notify(False))
+
+    # control events are handled before any of the queued telemetry,
+    # which is still delivered before the bus exits
+    assert seen[:4] == ["state.change", "shutdown", "model.new",
+                        "logging.message"]
+    assert len(seen) == 1003
+
+
+def test_batch_subscriber():
+    loop = asyncio.new_event_loop()
+    bus = Bus(loop=loop)
+    batches = []
+    bus.subscribe(batches.append, eq("logging.message"),
+                  batch=True, max_batch=4)
+
+    for i in range(10):
+        bus.dispatch(kind="logging.message", payload=i)
+    bus.dispatch(kind="state.change")
+    loop.run_until_complete(bus.notify(True))
+
+    assert [[e.payload for e in b] for b in batches] == [
+        [0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_stats():
+    loop = asyncio.new_event_loop()
+    bus = Bus(loop=loop)
+    bus.subscribe(lambda e: None, eq("a"))
+    bus.subscribe(lambda e: None)
+
+    for kind in ["a", "a", "b"]:
+        bus.dispatch(kind=kind)
+    loop.run_until_complete(bus.notify(True))
+
+    stats = bus.stats()
+    assert stats["dispatched"] == {"a": 2, "b": 1}
+    assert stats["delivered"] == {"a": 4, "b": 1}
+    assert stats["queue"] == {"depth": 0, "peak": 3}
+    assert stats["queue_latency"]["count"] == 3
+    handler = stats["handlers"]["<lambda>"]
+    assert handler["count"] == 5
+    assert sum(handler["buckets"].values()) == 5
+    assert handler["p99"] <= handler["max"]
+    assert bus.slowest(1)[0][0] == "<lambda>"
@@ -0,0 +1,63 @@
+import logging
+
+from pkg_resources import resource_filename
+import pytest
+
+from matrix import rules
+from matrix.graph import FINISH, START, format_plan
+
+
+def load(name="rules.1.yaml"):
+    return rules.load_suites([resource_filename(__name__, name)])
+
+
+def spec(*rule_specs):
+    return {"name": "t", "rules": [dict(r) for r in rule_specs]}
+
+
+def test_graph_dependencies():
+    graph = load()[0].graph
+    assert graph.deps["deploy"] == []
+    assert graph.deps["health"] == [("deploy", FINISH)]
+    # health.status is set by the health task while it runs
+    assert graph.deps["test_traffic"] == [("health", START)]
+    assert graph.deps["chaos"] == [("test_traffic", START)]
+    assert graph.order == ["deploy", "health", "test_traffic", "chaos"]
+    assert not graph.unreachable
+
+
+def test_graph_critical_path():
+    test = load()[0]
+    durations = {"deploy": 100, "health": 10, "test_traffic": 50,
+                 "chaos": 30}
+    total, path = test.graph.critical_path(durations)
+    assert total == 150
+    assert path == ["deploy", "health", "test_traffic"]
+    # test_traffic and health head equally long chains, the spec breaks
+    # the tie
+    assert [r.name for r in test.graph.prioritized(durations)] == [
+        "deploy", "test_traffic", "health", "chaos"]
+    assert [r.name for r in test.graph.prioritized()] == [
+        r.name for r in test.rules]
+    plan = format_plan(test, durations)
+    assert "critical path 150.0s: deploy -> health -> test_traffic" in plan
+
+
+def test_graph_cycle():
+    with pytest.raises(ValueError):
+        rules.Test.from_spec(spec(
+            {"do": "tests.a", "after": "b"},
+            {"do": "tests.b", "after": "a"}), 1)
+
+
+def test_graph_unreachable(caplog):
+    with caplog.at_level(logging.WARNING):
+        test = rules.Test.from_spec(spec(
+            {"do": "tests.a"},
+            {"do": "tests.b", "after": "nothing.complete"},
+            {"do": "tests.c", "when": "b"}), 1)
+    assert test.graph.unreachable == {"b": ["nothing.complete"],
+                                      "c": ["b"]}
+    assert "waits on nothing.complete" in caplog.text
+    steps = test.graph.schedule()
+    assert [s.start for s in steps] == [0.0, None, None]
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+
+from pkg_resources import resource_filename
+
+from matrix import journal
+from matrix import rules
+from matrix.bus import Bus
+from matrix.model import Context
+from matrix.view import RawView
+
+
+def test_journal_replay(tmpdir, capsys):
+    path = str(tmpdir.join("matrix.journal"))
+    suite = rules.load_suites([resource_filename(__name__, "rules.1.yaml")])
+    test = suite[0]
+
+    loop = asyncio.new_event_loop()
+    bus = Bus(loop=loop)
+    context = Context(loop=loop, bus=bus, config=None,
+                      juju_controller=None, suite=suite[:1])
+    j = journal.Journal(path)
+    j.subscribe(bus)
+    record = logging.makeLogRecord({"levelname": "INFO", "msg": "hello"})
+    record.output = "hello"
+    bus.dispatch(kind="test.start", origin="matrix", payload=test)
+    bus.dispatch(kind="logging.message", origin="matrix", payload=record)
+    bus.dispatch(kind="rule.done", origin="deploy",
+                 payload=dict(rule=test.rules[0], result=True))
+    bus.dispatch(kind="test.complete", origin="matrix",
+                 payload=dict(test=test, result=True))
+    bus.dispatch(kind="test.finish", origin="matrix", payload=context)
+    loop.run_until_complete(bus.notify(True))
+    j.close()
+
+    entries = list(journal.read_journal(path))
+    assert [e.kind for e in entries] == [
+        "test.start", "rule.done", "test.complete", "test.finish",
+        "logging.message"]
+    assert entries[1].payload.rule.name == "deploy"
+    assert entries[1].payload.rule.task.command == "matrix.tasks.deploy"
+    assert entries[0].payload.name == test.name
+    assert entries[4].payload.output == "hello"
+
+    replay_bus = Bus(loop=loop)
+    RawView(replay_bus, context)
+    loop.run_until_complete(journal.replay(replay_bus, path))
+    loop.run_until_complete(replay_bus.notify(False))
+    out = capsys.readouterr().out
+    assert "Start Test {}".format(test.name) in out
+    assert "hello" in out
+    assert "Run Complete" in out
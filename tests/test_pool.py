@@ -0,0 +1,71 @@
+import asyncio
+
+from matrix.bus import Bus
+from matrix.pool import ModelPool, Reaper
+from matrix.view import RawView
+
+
+def test_model_pool():
+    loop = asyncio.new_event_loop()
+    created, destroyed = [], []
+
+    async def create():
+        name = "model-{}".format(len(created))
+        created.append(name)
+        await asyncio.sleep(0.01)
+        return name
+
+    async def destroy(model):
+        destroyed.append(model)
+
+    pool = ModelPool(loop, 2, create, destroy)
+    pool.fill()
+    assert len(pool) == 2
+
+    async def run():
+        first = await pool.get()
+        # the replacement is already on its way
+        assert len(pool) == 2
+        second = await pool.get()
+        await pool.close()
+        return first, second
+
+    assert loop.run_until_complete(run()) == ("model-0", "model-1")
+    assert created == ["model-0", "model-1", "model-2", "model-3"]
+    assert destroyed == ["model-2", "model-3"]
+    loop.close()
+
+
+def test_reaper(capsys):
+    loop = asyncio.new_event_loop()
+    running, peak = [], []
+
+    async def teardown(name):
+        running.append(name)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.remove(name)
+        if name == "broken":
+            raise ValueError("gone")
+        return {"crashdump": None, "destroyed": True}
+
+    async def run():
+        reaper = Reaper(loop, 2)
+        for name in ["a", "b", "c", "broken"]:
+            reaper.submit(name, teardown(name))
+        assert len(reaper) == 4
+        await reaper.wait()
+        return reaper
+
+    reaper = loop.run_until_complete(run())
+    assert max(peak) == 2
+    assert len(reaper) == 0
+    results = {r["model"]: r for r in reaper.results}
+    assert results["a"]["destroyed"] is True
+    assert results["broken"]["error"] == "gone"
+
+    RawView(Bus(loop=loop), None).show_teardowns(reaper.results)
+    out = capsys.readouterr().out
+    assert "destroy ok" in out
+    assert "error: gone" in out
+    loop.close()
@@ -1,7 +1,15 @@
+import asyncio
+import json
+
+import mock
+import pytest
+
 from pkg_resources import resource_filename
 
 from matrix import model
 from matrix import rules
+from matrix.bus import Bus
+from matrix.checkpoint import Checkpoint
 
 
 def loader(name):
@@ -54,3 +62,127 @@ def test_rule_conditions():
     # The until condition here is already met
     # thus the rule won't match
     assert t[3].match(context) is False
+
+
+def test_rule_wakes_on_state_change():
+    loop = asyncio.new_event_loop()
+    bus = Bus(loop=loop)
+    engine = rules.RuleEngine(bus)
+    engine.interval = 3600  # polling would never get there in time
+    context = model.Context(
+            loop=loop, bus=bus, config=engine,
+            juju_controller=None, suite=[])
+    ran = []
+
+    async def task(context, rule, task, event=None):
+        ran.append(loop.time())
+        return True
+
+    context.tasks["tests.first"] = task
+    context.tasks["tests.second"] = task
+    first = model.Rule(model.Task("tests.first"))
+    second = model.Rule(model.Task("tests.second"),
+                        [model.Condition("after", "first")])
+
+    async def run():
+        blocked = loop.create_task(engine.rule_runner(second, context))
+        await asyncio.sleep(0.01)
+        assert not ran
+        assert "first" in context.states.watches
+        await engine.rule_runner(first, context)
+        return await asyncio.wait_for(blocked, 1)
+
+    start = loop.time()
+    assert loop.run_until_complete(run()) is True
+    assert len(ran) == 2
+    assert ran[1] - start < 1
+    assert not context.states.watches
+
+
+@pytest.mark.parametrize("where", ["rule", "test"])
+def test_timeout(where):
+    loop = asyncio.new_event_loop()
+    bus = Bus(loop=loop)
+    engine = rules.RuleEngine(bus)
+    engine.interval = 0.01
+    context = model.Context(
+            loop=loop, bus=bus, config=engine,
+            juju_controller=None, suite=[])
+    seen = []
+    bus.subscribe(lambda e: seen.append(e.kind),
+                  lambda e: e.kind.endswith(".timeout"))
+
+    async def forever(context, rule, task, event=None):
+        await asyncio.sleep(3600)
+
+    async def done(context, rule, task, event=None):
+        return True
+
+    context.tasks["tests.forever"] = forever
+    context.tasks["tests.after"] = done
+    spec = {"name": "hung", "rules": [
+        {"do": "tests.forever", "gating": False},
+        {"do": "tests.after", "after": "forever"}]}
+    if where == "rule":
+        spec["rules"][0]["timeout"] = 0.05
+    else:
+        spec["timeout"] = 0.05
+    test = rules.Test.from_spec(spec, 1)
+    context.test = test
+
+    start = loop.time()
+    assert loop.run_until_complete(engine.run_once(context, test)) is False
+    loop.run_until_complete(bus.notify(True))
+    assert loop.time() - start < 1
+    # timeouts gate even on non gating tasks
+    assert engine.exit_code == 101
+    assert seen == ["{}.timeout".format(where)]
+    assert len(engine.timers) == 0
+
+
+def test_resume(tmpdir):
+    loop = asyncio.new_event_loop()
+    bus = Bus(loop=loop)
+    engine = rules.RuleEngine(bus)
+    engine.interval = 0.01
+    engine.model = None
+    engine.keep_models = True
+    context = model.Context(
+            loop=loop, bus=bus, config=engine,
+            juju_controller=None, suite=[])
+    path = tmpdir.join("checkpoint.json")
+    path.write(json.dumps({
+        "finished": {"done": True},
+        "running": {"half": {"model": "matrix-half",
+                             "states": {"first": "complete"}}},
+        "exit_code": None}))
+    engine.checkpoint = Checkpoint.load(str(path))
+    ran, connected = [], []
+
+    async def task(context, rule, task, event=None):
+        ran.append(rule.name)
+        return True
+
+    async def add_model(context, name=None):
+        connected.append(name)
+        context.juju_model = mock.Mock()
+        context.juju_model.info.name = name
+
+    engine.add_model = add_model
+    context.tasks["tests.first"] = task
+    context.tasks["tests.second"] = task
+    done = rules.Test.from_spec(
+        {"name": "done", "rules": [{"do": "tests.first"}]}, 1)
+    half = rules.Test.from_spec(
+        {"name": "half", "rules": [{"do": "tests.first"},
+                                   {"do": "tests.second",
+                                    "after": "first"}]}, 1)
+
+    assert loop.run_until_complete(engine.run_test(context, done)) is True
+    context.test = half
+    assert loop.run_until_complete(engine.run_test(context, half)) is True
+    assert connected == ["matrix-half"]
+    assert ran == ["second"]
+    data = json.loads(path.read())
+    assert data["finished"] == {"done": True, "half": True}
+    assert data["running"] == {}
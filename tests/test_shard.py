@@ -0,0 +1,61 @@
+import asyncio
+import sys
+
+from pkg_resources import resource_filename
+
+from matrix import rules
+from matrix.bus import Bus
+from matrix.model import Context
+from matrix.shard import Coordinator, partition
+from matrix.view import RawView, XUnitView
+
+
+def load():
+    return rules.load_suites([resource_filename(__name__, "rules.1.yaml")])
+
+
+def test_partition():
+    tests = load()
+    durations = {
+        "traffic & chaos": {"deploy": 100, "health": 10,
+                            "test_traffic": 50, "chaos": 30},
+        "just-traffic": {"deploy": 100, "health": 10, "test_traffic": 20},
+    }
+    shards = partition(tests, durations, 2)
+    # the longest test gets a shard to itself, the unknown one counts as
+    # the average of the others
+    assert [[t.name for t in s] for s in shards] == [
+        ["traffic & chaos"], ["just-traffic", "test run_action"]]
+    assert partition(tests, {}, 5)[3:] == [[], []]
+
+
+def test_coordinator(tmpdir, capsys):
+    loop = asyncio.new_event_loop()
+    bus = Bus(loop=loop)
+    engine = rules.RuleEngine(bus)
+    engine.shards = 2
+    engine.shard_command = "{} {}".format(
+        sys.executable, resource_filename(__name__, "fake_shard.py"))
+    engine.shard_controllers = []
+    engine.argv = []
+    engine.output_dir = str(tmpdir)
+    engine.model_prefix = "matrix"
+    engine.test_pattern = ["*"]
+    context = Context(loop=loop, bus=bus, config=engine,
+                      juju_controller=None, suite=load())
+    RawView(bus, context)
+    xunit = XUnitView(bus, context, str(tmpdir.join("xunit.xml")))
+
+    notify = loop.create_task(bus.notify(False))
+    exit_code = loop.run_until_complete(Coordinator(engine, context).run())
+    loop.run_until_complete(notify)
+
+    assert exit_code == 101
+    out = capsys.readouterr().out
+    assert "traffic & chaos on matrix-s0" in out
+    assert "just-traffic on matrix-s1" in out
+    results = {r["name"].split(": ")[1]: r["result"]
+               for r in xunit.results}
+    assert results == {"traffic & chaos": False, "just-traffic": True,
+                       "test run_action": False}
+    assert tmpdir.join("shard-0", "worker.log").check()
@@ -0,0 +1,94 @@
+import asyncio
+import time
+
+from pkg_resources import resource_filename
+
+from matrix.bus import Bus
+from matrix import rules
+from matrix import simulate
+
+
+def test_virtual_time_loop():
+    loop = simulate.VirtualTimeLoop()
+    start = time.monotonic()
+
+    async def nap():
+        await asyncio.sleep(3600)
+        return loop.time()
+
+    assert loop.run_until_complete(nap()) >= 3600
+    assert time.monotonic() - start < 1
+    loop.close()
+
+
+def engine_for(loop, tmpdir, spec):
+    bus = Bus(loop=loop)
+    engine = rules.RuleEngine(bus)
+    path = tmpdir.join("simulate.yaml")
+    path.write(spec)
+    engine.simulate = str(path)
+    engine.default_suite = resource_filename("matrix", "matrix.yaml")
+    engine.additional_suites = []
+    engine.bundle_suite = None
+    engine.path = tmpdir
+    engine.output_dir = str(tmpdir)
+    engine.test_pattern = ["*"]
+    engine.interval = 5
+    engine.model = None
+    engine.keep_models = False
+    engine.model_prefix = "matrix"
+    engine.cloud = None
+    engine.max_jobs = 1
+    engine.max_teardowns = 4
+    engine.resume = False
+    engine.ha = True
+    engine.fail_fast = False
+    return engine
+
+
+def test_simulate(tmpdir, capsys):
+    loop = simulate.VirtualTimeLoop()
+    engine = engine_for(loop, tmpdir, """
+tasks:
+  matrix.tasks.deploy:
+    duration: 1800
+  matrix.tasks.chaos:
+    duration: 3600
+    result: fail
+""")
+    context = engine.load_suite()
+    start = time.monotonic()
+    loop.run_until_complete(engine.run(context))
+    loop.run_until_complete(engine.bus.notify(True))
+    # two hours of deploys, health checks and chaos
+    assert loop.time() >= 7200
+    assert time.monotonic() - start < 10
+    out = capsys.readouterr().out
+    lines = [line.split() for line in out.splitlines()]
+    assert ["1810.0s", "deployment", "test.complete", "deployment",
+            "True"] in lines
+    assert ["7220.0s", "end_to_end", "test.complete", "end_to_end",
+            "False"] in lines
+    assert "Simulated run took 7220.0s, exit code 101" in out
+    assert engine.exit_code == 101
+    # nothing is recorded for the next real run
+    assert not tmpdir.join("durations.json").exists()
+    assert not tmpdir.join("checkpoint.json").exists()
+
+
+def test_reuse_deployment(tmpdir, capsys):
+    loop = simulate.VirtualTimeLoop()
+    engine = engine_for(loop, tmpdir, """
+tasks:
+  matrix.tasks.deploy:
+    duration: 1800
+""")
+    engine.reuse_deployment = True
+    context = engine.load_suite()
+    loop.run_until_complete(engine.run(context))
+    loop.run_until_complete(engine.bus.notify(True))
+    lines = [line.split() for line in capsys.readouterr().out.splitlines()]
+    # end_to_end starts on the deployment of the deployment test
+    assert ["1810.0s", "end_to_end", "rule.done", "deploy", "True"] in lines
+    assert engine.exit_code is None
+    assert len(context.teardowns) == 1
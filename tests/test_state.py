@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+
+from matrix.state import StateStore
+
+
+def test_versions_and_diff():
+    states = StateStore(deploy="running")
+    version, snapshot = states.snapshot()
+    assert (version, snapshot) == (1, {"deploy": "running"})
+
+    states["deploy"] = "running"  # unchanged, not a new version
+    assert states.version == 1
+    states["deploy"] = "complete"
+    states["health.status"] = "busy"
+    assert states.diff(version) == (
+        {"deploy": "complete", "health.status": "busy"}, [])
+
+    version = states.version
+    del states["health.status"]
+    assert states.diff(version) == ({}, ["health.status"])
+    states.clear()
+    assert states.diff(0) == ({}, ["health.status", "deploy"])
+
+
+def test_wait_for():
+    loop = asyncio.new_event_loop()
+    states = StateStore()
+    calls = []
+    handle = states.watch("health.status",
+                          lambda key, value: calls.append(value),
+                          lambda value: value != "busy")
+
+    async def run():
+        waiter = loop.create_task(states.wait_for(
+            "health.status", lambda value: value == "healthy", loop=loop))
+        changed = states.changed(["health.status", "chaos"], loop=loop)
+        await asyncio.sleep(0)
+        states["health.status"] = "busy"
+        assert await changed == "health.status"
+        assert not waiter.done()
+        states["health.status"] = "healthy"
+        assert await waiter == "healthy"
+        # already holds an acceptable value
+        assert await states.wait_for("health.status") == "healthy"
+        with pytest.raises(asyncio.TimeoutError):
+            await states.wait_for("chaos", timeout=0.01, loop=loop)
+
+    loop.run_until_complete(run())
+    assert calls == ["healthy"]
+    states.unwatch(handle)
+    assert states.watches == {}
+    loop.close()
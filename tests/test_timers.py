@@ -0,0 +1,20 @@
+import asyncio
+
+from matrix.timers import Timers
+
+
+def test_timers():
+    loop = asyncio.new_event_loop()
+    timers = Timers(loop)
+    fired = []
+    timers.call_later(0.03, fired.append, "late")
+    early = timers.call_later(0.01, fired.append, "early")
+    timers.call_later(0.02, fired.append, "middle")
+    early.cancel()
+    assert len(timers) == 2
+
+    loop.run_until_complete(asyncio.sleep(0.05))
+    assert fired == ["middle", "late"]
+    assert len(timers) == 0
+    timers.close()
+    loop.close()
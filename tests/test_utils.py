@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 import mock
 from pathlib import Path
@@ -33,3 +35,21 @@ class TestUtils(unittest.TestCase):
             utils.valid_bundle_or_spell(Path('tests/bad_bundle')))
         self.assertFalse(
             utils.valid_bundle_or_spell(Path('tests/bad_bundle_file')))
+
+    def test_load_yaml_cache(self):
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.dict(os.environ, {"MATRIX_CACHE_DIR": tmp}):
+            path = Path(tmp, "suite.yaml")
+            path.write_text("tests: [{name: one}]\n")
+            self.assertEqual(utils.load_yaml(path),
+                             {"tests": [{"name": "one"}]})
+            with mock.patch.object(utils, "parse_yaml") as parse:
+                data = utils.load_yaml(path)
+                self.assertFalse(parse.called)
+            # callers get copies they can modify
+            data["tests"].append({"name": "two"})
+            self.assertEqual(utils.load_yaml(path),
+                             {"tests": [{"name": "one"}]})
+            # new content, new key
+            path.write_text("tests: []\n")
+            self.assertEqual(utils.load_yaml(path), {"tests": []})
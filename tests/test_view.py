@@ -1,4 +1,5 @@
 import collections
+import mock
 from matrix import view
 import urwid
 
@@ -30,3 +31,41 @@ def test_list_widget():
     status_walker = view.SimpleListRenderWalker(status)
     assert status_walker[0].text == "0"
     assert status_walker[1].text == "1"
+
+
+def test_xunit_parallel(tmpdir):
+    import asyncio
+    import logging
+    from matrix.bus import Bus
+    from matrix.model import Rule, Task
+
+    loop = asyncio.new_event_loop()
+    bus = Bus(loop=loop)
+    xunit = view.XUnitView(bus, None, str(tmpdir.join("xunit.xml")))
+    tests = []
+    for name in ["one", "two"]:
+        test = mock.Mock(rules=[Rule(Task("matrix.tasks.deploy"))])
+        test.name = name
+        tests.append(test)
+        bus.dispatch(kind="test.start", test=name, payload=test)
+
+    def log(test, msg, level="INFO"):
+        record = logging.makeLogRecord({"levelname": level})
+        record.output = msg
+        bus.dispatch(kind="logging.message", test=test, payload=record)
+
+    log("one", "one says hi")
+    log("two", "two failed", "ERROR")
+    log(None, "untagged")
+    loop.run_until_complete(bus.notify(True))
+    bus.dispatch(kind="test.complete", test="two",
+                 payload=dict(test=tests[1], result=False))
+    bus.dispatch(kind="test.complete", test="one",
+                 payload=dict(test=tests[0], result=True))
+    loop.run_until_complete(bus.notify(True))
+
+    one, two = xunit.records["one"], xunit.records["two"]
+    assert one["output"] == ["one says hi", "untagged"]
+    assert two["output"] == ["two failed", "untagged"]
+    assert two["errors"] == ["two failed"]
+    assert [r["result"] for r in xunit.results] == [False, True]